@@ -0,0 +1,205 @@
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")   # Run without a display
+ROOT_DIRECTORY = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIRECTORY)
+
+from PyQt6.QtWidgets import QApplication  # noqa: E402
+
+from catalog import load_sources, save_sources, cache_files  # noqa: E402
+from main import GUIScene  # noqa: E402
+from positions import local_to_lst, lst_hours  # noqa: E402
+
+DEFAULT_SIZES = (10, 1000, 100000, 1000000)
+BASELINE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+COORDINATES = (60.4, 25.1)
+NOISE_FACTOR = 3    # Multiple of the measured spread of repeats that a slowdown must exceed to be flagged
+
+
+def write_catalog(file, size, seed=0):
+    """Writes a synthetic source file of given size in the sources.csv format."""
+
+    rng = np.random.default_rng(seed)
+    right_ascension = rng.uniform(0, 24, size)
+    declination = np.degrees(np.arcsin(rng.uniform(-1, 1, size)))  # Uniform over the sphere
+
+    with open(os.path.join(ROOT_DIRECTORY, "default_sources.txt"), encoding="utf-8") as default_file:
+        type_section = default_file.read().split("\n\n")[0]
+
+    with open(file, 'w', newline='', encoding="utf-8") as source_file:
+        source_file.write(type_section.replace("\n", "\r\n") + "\r\n\r\n")
+        source_file.write("Source|Right Ascension|Declination|Type|Trace\r\n")
+        for i, (ra, dec) in enumerate(zip(right_ascension.tolist(), declination.tolist())):
+            sign = '+' if dec >= 0 else '-'
+            dec = abs(dec)
+            source_file.write(f"SRC {i}|{int(ra):02d}:{int(ra % 1 * 60):02d}:{ra * 3600 % 60:06.3f}"
+                              f"|{sign}{int(dec):02d}:{int(dec % 1 * 60):02d}:{dec * 3600 % 60:06.3f}"
+                              f"|{i % 5}|{int(i % 100 == 0)}\r\n")
+
+
+def measure(function, repeats, setup=None):
+    """Returns the minimum and median duration of a function in seconds and their spread.
+
+    The spread is the median's excess over the minimum relative to the minimum, a measure of timing noise.
+    """
+
+    durations = []
+    for _ in range(repeats):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        function()
+        durations.append(time.perf_counter() - start)
+
+    median = statistics.median(durations)
+    return {"min": min(durations), "median": median, "spread": median / max(min(durations), 1e-9) - 1}
+
+
+def run_size(size, repeats, gui_limit):
+    """Runs all benchmarks on a synthetic catalog of given size and returns their timings."""
+
+    results = {}
+    source_file = "sources.csv"
+    write_catalog(source_file, size)
+
+    def remove_cache():
+        for file in cache_files(source_file):
+            if os.path.exists(file):
+                os.remove(file)
+
+    results["load_sources_uncached"] = measure(lambda: load_sources(source_file), repeats, remove_cache)
+    results["load_sources_cached"] = measure(lambda: load_sources(source_file), repeats)
+
+    types, sources = load_sources(source_file)
+
+    def toggle_trace():
+        sources[0][4] = 1 - sources[0][4]
+
+    def move_source():
+        sources[0][1] = (sources[0][1] + 1) % 24
+
+    results["save_sources_in_place"] = measure(lambda: save_sources(types, sources, source_file), repeats,
+                                               toggle_trace)
+    results["save_sources_rewrite"] = measure(lambda: save_sources(types, sources, source_file), repeats,
+                                              move_source)
+
+    timestamps = time.time() + np.arange(size) * 60.0
+    results["local_to_lst"] = measure(lambda: [local_to_lst(t, COORDINATES) for t in timestamps[:10000].tolist()],
+                                      repeats)
+    results["lst_hours_vectorized"] = measure(lambda: lst_hours(timestamps, COORDINATES), repeats)
+
+    if size <= gui_limit:
+        scenes = []
+
+        def reset_scene():
+            scenes.clear()
+            load_sources(source_file)   # Construct from an up-to-date cache
+
+        results["gui_scene_construction"] = measure(
+            lambda: scenes.append(GUIScene((1200, 700), 3.0, (20, 80), time.time(), COORDINATES)), repeats,
+            reset_scene)
+
+        scene = scenes[-1]
+
+        def step_time():
+            scene.local_time += 3600
+
+        results["gui_scene_update_time"] = measure(scene.update_time, max(repeats, 5), step_time)
+        scenes.clear()
+
+    return results
+
+
+def compare(results, baseline, threshold, min_difference):
+    """Returns descriptions of benchmarks slower than the baseline beyond their noise, given fraction and seconds.
+
+    Minimum durations are compared, and the allowed slowdown grows to NOISE_FACTOR times the larger spread of the
+    current and baseline repeats, so that noisy benchmarks are only flagged on clear slowdowns.
+    """
+
+    regressions = []
+    for size, benchmarks in results.items():
+        for name, timing in benchmarks.items():
+            reference = baseline.get(size, {}).get(name)
+            if reference is None:
+                continue
+
+            ratio = timing["min"] / max(reference["min"], 1e-9)
+            allowed = max(threshold, NOISE_FACTOR * max(timing["spread"], reference.get("spread", 0)))
+            print(f"  {size:>8} {name:26} {timing['min'] * 1000:12.3f} ms  {ratio:6.2f}x baseline"
+                  f"  (allowed {1 + allowed:.2f}x)")
+            if ratio > 1 + allowed and timing["min"] - reference["min"] > min_difference:
+                regressions.append(f"{name} with {size} sources: {ratio:.2f}x baseline, allowed {1 + allowed:.2f}x")
+
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark loading, position and GUI hot paths.")
+    parser.add_argument("--sizes", type=int, nargs='+', default=DEFAULT_SIZES, help="catalog sizes to benchmark")
+    parser.add_argument("--repeats", type=int, default=7, help="repetitions per benchmark")
+    parser.add_argument("--gui-limit", type=int, default=max(DEFAULT_SIZES),
+                        help="largest catalog size to construct a GUI scene for")
+    parser.add_argument("--output", default="benchmark_results.json", help="JSON file to write results to")
+    parser.add_argument("--baseline", default=BASELINE_FILE, help="JSON file of baseline results to compare to")
+    parser.add_argument("--threshold", type=float, default=0.25,
+                        help="smallest allowed slowdown before flagging, 0.25=25%%, widened for noisy benchmarks")
+    parser.add_argument("--min-difference", type=float, default=0.002,
+                        help="smallest slowdown in seconds flagged, to ignore noise of very fast benchmarks")
+    parser.add_argument("--save-baseline", action="store_true", help="store results as the new baseline")
+    args = parser.parse_args()
+
+    app = QApplication.instance() or QApplication([])
+    working_directory = os.getcwd()
+    benchmark_directory = tempfile.mkdtemp(prefix="astronomy_tracer_benchmark_")
+    results = {}
+    try:
+        os.chdir(benchmark_directory)
+        for size in args.sizes:
+            print(f"Benchmarking {size} sources...")
+            results[str(size)] = run_size(size, args.repeats, args.gui_limit)
+    finally:
+        os.chdir(working_directory)
+        shutil.rmtree(benchmark_directory, ignore_errors=True)
+
+    report = {"python": platform.python_version(), "machine": platform.machine(), "processor": platform.processor(),
+              "time": time.strftime("%Y-%m-%d %H:%M"), "results": results}
+    with open(args.output, 'w', encoding="utf-8") as output_file:
+        json.dump(report, output_file, indent=2)
+    print(f"Results written to {args.output}")
+
+    if args.save_baseline:
+        with open(args.baseline, 'w', encoding="utf-8") as baseline_file:
+            json.dump(report, baseline_file, indent=2)
+        print(f"Baseline saved to {args.baseline}")
+        return
+
+    if not os.path.isfile(args.baseline):
+        print("No baseline to compare to, store one with --save-baseline")
+        return
+
+    with open(args.baseline, encoding="utf-8") as baseline_file:
+        baseline = json.load(baseline_file)["results"]
+
+    print("Comparison to baseline (minimum):")
+    regressions = compare(results, baseline, args.threshold, args.min_difference)
+    if regressions:
+        print("Regressions:")
+        for regression in regressions:
+            print(f"  {regression}")
+        sys.exit(1)
+    print("No regressions")
+
+
+if __name__ == '__main__':
+    main()
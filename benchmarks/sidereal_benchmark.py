@@ -0,0 +1,88 @@
+import calendar
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sidereal import local_sidereal_hours  # noqa: E402
+
+VERNAL_EQUINOX_UTC = "2025-03-20 09:01"     # Constants of the replaced utc_to_lst
+LST_FIX = -7.3 / 60
+
+
+def legacy_utc_to_lst(utc_time, coords):
+    """Previous LST estimate from a fixed vernal equinox, kept for comparison."""
+
+    time_since_vernal_equinox = (time.mktime(utc_time)
+                                 - time.mktime(time.strptime(VERNAL_EQUINOX_UTC, "%Y-%m-%d %H:%M")))
+    equinox_offset = 12 + time_since_vernal_equinox / (365 * 24 * 60 * 60) * 24
+    longitude_offset = coords[1] / 360 * 24
+
+    return time.gmtime(calendar.timegm(utc_time) + (equinox_offset + longitude_offset + LST_FIX) * 60 * 60)
+
+
+def legacy_lst_hours(unix_time, coords):
+    """Returns the previous LST estimate as fractional hours."""
+
+    lst = legacy_utc_to_lst(time.gmtime(unix_time), coords)
+    return lst.tm_hour + lst.tm_min / 60 + lst.tm_sec / 3600
+
+
+def usno_gmst_hours(unix_time):
+    """Independent GMST approximation published by the USNO, accurate to about 0.1 s per century."""
+
+    days = unix_time / 86400 + 2440587.5 - 2451545.0
+    return (18.697374558 + 24.06570982441908 * days) % 24
+
+
+def evaluations_per_second(function, count):
+    """Returns how many evaluations per second a function doing given count of them reaches."""
+
+    start = time.perf_counter()
+    function()
+    return count / (time.perf_counter() - start)
+
+
+def main():
+    rng = np.random.default_rng(0)
+    timestamps = rng.uniform(calendar.timegm((2000, 1, 1, 0, 0, 0)), calendar.timegm((2050, 1, 1, 0, 0, 0)),
+                             1_000_000)
+    coords = (60.4, 25.1)
+
+    scalars = timestamps[:10000].tolist()
+    throughputs = (
+        ("vectorized, 1M timestamps", lambda: local_sidereal_hours(timestamps, coords[1]), len(timestamps)),
+        ("scalar, uncached", lambda: [local_sidereal_hours(t, coords[1]) for t in scalars], len(scalars)),
+        ("scalar, repeated frame", lambda: [local_sidereal_hours(scalars[0], coords[1]) for _ in scalars],
+         len(scalars)),
+        ("previous utc_to_lst", lambda: [legacy_lst_hours(t, coords) for t in scalars[:2000]], 2000),
+    )
+
+    print("Throughput (evaluations per second):")
+    for name, function, count in throughputs:
+        print(f"  {name + ':':27} {evaluations_per_second(function, count):14,.0f}")
+
+    print()
+    print("Precision (difference in minutes of time):")
+    samples = timestamps[:20000]
+    new = local_sidereal_hours(samples, coords[1])
+    reference = (usno_gmst_hours(samples) + coords[1] / 15) % 24
+    legacy = np.array([legacy_lst_hours(t, coords) for t in samples.tolist()])
+    for name, values in (("new vs USNO formula", new - reference), ("previous vs USNO formula", legacy - reference)):
+        minutes = ((values + 12) % 24 - 12) * 60
+        print(f"  {name + ':':27} mean {minutes.mean():+9.4f}, max abs {np.abs(minutes).max():9.4f}")
+
+    print()
+    print("Previous estimate drift by year (mean minutes vs USNO formula):")
+    years = np.array([time.gmtime(t).tm_year for t in samples.tolist()])
+    for year in range(2000, 2050, 5):
+        in_year = years == year
+        drift = ((legacy[in_year] - reference[in_year] + 12) % 24 - 12) * 60
+        print(f"  {year}: {drift.mean():+8.2f}")
+
+
+if __name__ == '__main__':
+    main()
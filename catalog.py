@@ -0,0 +1,355 @@
+import csv
+import gc
+import json
+import os
+import shutil
+
+import numpy as np
+
+from ephemeris import BODIES, body_index
+from instrumentation import profiler
+from precession import J2000_YEAR
+
+SOURCE_FILE = "sources.csv"
+CONFIG_FILE = "config.csv"
+
+CACHE_VERSION = 3
+SOURCE_RECORD = np.dtype([("right_ascension", np.float64), ("declination", np.float64), ("type", np.int32),
+                          ("trace", np.int8), ("type_offset", np.int64), ("type_width", np.int16),
+                          ("trace_width", np.int16), ("epoch", np.float64), ("pm_right_ascension", np.float64),
+                          ("pm_declination", np.float64), ("body", np.int8)])
+
+
+def create_default_file(file, default_path, template):
+    """Creates the default config or source file from its template next to this module if it doesn't exist yet.
+
+    Other given files are left alone, so that a missing one is reported instead of replaced.
+    """
+
+    if file == default_path and not os.path.isfile(file):
+        shutil.copy(os.path.join(os.path.dirname(os.path.abspath(__file__)), template), file)
+
+
+def load_config(file=CONFIG_FILE):
+    """Loads config file."""
+
+    create_default_file(file, CONFIG_FILE, "default_config.txt")
+    
+    with open(file, newline='', encoding="utf-8") as csv_file:
+        csv_reader = csv.reader(csv_file, delimiter='|')
+        next(csv_reader)  # Skip header row
+        for row in csv_reader:
+            print(f"Coordinates: {float(row[0]):.3f}° N, {float(row[1]):.3f}° E")
+            return float(row[0]), float(row[1]), float(row[2]), float(row[3]), int(row[4]), int(row[5]), float(row[6])
+
+
+def load_sites(file=CONFIG_FILE):
+    """Loads observation sites as (name, latitude, longitude, min elevation, max elevation), one per config row.
+
+    GUI settings are only read from the first row, so later rows may leave them empty.
+    """
+
+    create_default_file(file, CONFIG_FILE, "default_config.txt")
+
+    sites = []
+    with open(file, newline='', encoding="utf-8") as csv_file:
+        csv_reader = csv.reader(csv_file, delimiter='|')
+        next(csv_reader)  # Skip header row
+        for row in csv_reader:
+            if len(row) < 4:
+                continue
+            name = row[7] if len(row) > 7 and row[7] else f"Site {len(sites) + 1}"
+            sites.append((name, float(row[0]), float(row[1]), float(row[2]), float(row[3])))
+
+    return sites
+
+
+@profiler.timed("load_sources")
+def load_sources(file=SOURCE_FILE):
+    """Load and return the source list.
+
+    Sources are [name, RA, Dec, type, trace], followed by [epoch, PM RA, PM Dec] if any source has them. Solar
+    system bodies have the body name in place of RA.
+    """
+
+    create_default_file(file, SOURCE_FILE, "default_sources.txt")
+
+    types, names, records = load_source_records(file)
+    columns = [names, records["right_ascension"].tolist(), records["declination"].tolist(), records["type"].tolist(),
+               records["trace"].tolist()]
+    if (np.any(records["epoch"] != J2000_YEAR) or np.any(records["pm_right_ascension"])
+            or np.any(records["pm_declination"])):
+        columns += [records["epoch"].tolist(), records["pm_right_ascension"].tolist(),
+                    records["pm_declination"].tolist()]
+
+    # The source lists hold no reference cycles, so the cyclic garbage collector is paused instead of repeatedly
+    # scanning the growing list, which takes most of the time for large catalogs
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        sources = list(map(list, zip(*columns)))
+    finally:
+        if gc_enabled:
+            gc.enable()
+    for i in np.flatnonzero(records["body"] >= 0).tolist():
+        sources[i][1] = BODIES[records["body"][i]][0]
+
+    return types, sources
+
+
+def load_source_records(file=SOURCE_FILE):
+    """Returns types, names and a memory-mapped record array of the source file.
+
+    The records are read from a binary cache next to the source file, which is rebuilt from the source file
+    whenever its modification time or size no longer match the cache.
+    """
+
+    cache = read_cache(file)
+    if cache is None:
+        types, names, records = parse_sources(file)
+        try:
+            write_cache(file, types, names, records)
+        except OSError:
+            return types, names, records    # Sources are still loaded without the cache, e.g. in a read-only directory
+        cache = read_cache(file) or (types, names, records)
+
+    return cache
+
+
+def parse_sources(file):
+    """Parses the source file into types, names and a record array including field offsets.
+
+    Source rows may have optional epoch and proper motion columns after the trace column, with empty fields
+    meaning J2000 and no motion. Proper motions are in mas/yr, the RA motion including cos(dec). Rows of solar
+    system bodies have the body name, e.g. Moon or Jupiter, in place of RA and an empty Dec.
+    """
+
+    with open(file, 'rb') as source_file:
+        data = source_file.read()
+
+    types = []
+    names = []
+    rows = []
+    data_type = 0
+    skip_header = True
+    line_start = 0
+    for line in data.split(b'\n'):
+        line_offset = line_start
+        line_start += len(line) + 1
+        line = line.rstrip(b'\r')
+
+        if skip_header:
+            skip_header = False
+            continue
+        if len(line) == 0:
+            if line_start <= len(data):
+                data_type += 1
+                skip_header = True
+            continue
+
+        # Quoted rows need the CSV parser, other rows can be split directly
+        quoted = b'"' in line
+        if quoted:
+            row = next(csv.reader([line.decode("utf-8")], delimiter='|'))
+        else:
+            row = line.decode("utf-8").split('|')
+
+        if data_type == 0:
+            types.append((int(row[0]), row[1]))
+        elif data_type == 1:
+            # Type and trace fields can only be patched in place when the row has no quoting
+            if quoted or len(row) not in (5, 8):
+                type_offset, type_width, trace_width = -1, 0, 0
+            else:
+                type_offset = line_offset + len(line) - len('|'.join(row[3:]))
+                type_width, trace_width = len(row[3]), len(row[4])
+
+            epoch, pm_right_ascension, pm_declination = J2000_YEAR, 0.0, 0.0
+            if len(row) > 5:
+                epoch = float(row[5]) if row[5] else J2000_YEAR
+                pm_right_ascension = float(row[6]) if len(row) > 6 and row[6] else 0.0
+                pm_declination = float(row[7]) if len(row) > 7 and row[7] else 0.0
+
+            body = body_index(row[1]) if ':' not in row[1] else -1
+            if body >= 0:
+                right_ascension, declination = 0.0, 0.0
+            else:
+                right_ascension, declination = parse_right_ascension(row[1]), parse_declination(row[2])
+
+            names.append(row[0])
+            rows.append((right_ascension, declination, int(row[3]), int(row[4]), type_offset, type_width,
+                         trace_width, epoch, pm_right_ascension, pm_declination, body))
+
+    return types, names, np.array(rows, dtype=SOURCE_RECORD)
+
+
+def parse_right_ascension(text):
+    """Converts sexagesimal right ascension to hours."""
+
+    right_ascension = text.split(':')
+    return int(right_ascension[0]) + int(right_ascension[1]) / 60. + float(right_ascension[2]) / 3600
+
+
+def parse_declination(text):
+    """Converts sexagesimal declination to degrees."""
+
+    declination = text.split(':')
+    if declination[0][0] == '-':
+        sign = -1
+    else:
+        sign = 1
+    return sign * (int(declination[0][1:]) + int(declination[1]) / 60. + float(declination[2]) / 3600)
+
+
+def cache_files(file):
+    """Returns paths of the record, name and metadata cache files of a source file."""
+
+    return f"{file}.cache.npy", f"{file}.cache.txt", f"{file}.cache.json"
+
+
+def read_cache(file, mode='r'):
+    """Returns cached types, names and records memory-mapped in given mode, or None if the cache is missing or stale."""
+
+    record_file, name_file, meta_file = cache_files(file)
+    try:
+        with open(meta_file, encoding="utf-8") as meta:
+            meta = json.load(meta)
+        file_stat = os.stat(file)
+        if (meta["version"] != CACHE_VERSION or meta["mtime_ns"] != file_stat.st_mtime_ns
+                or meta["size"] != file_stat.st_size):
+            return None
+
+        records = np.load(record_file, mmap_mode=mode)
+        with open(name_file, encoding="utf-8") as names:
+            names = names.read().split('\n')[:-1]
+        if len(names) != len(records) or records.dtype != SOURCE_RECORD:
+            return None
+    except (OSError, ValueError, KeyError):
+        return None
+
+    return [tuple(source_type) for source_type in meta["types"]], names, records
+
+
+def write_cache(file, types, names, records):
+    """Writes the binary cache of a source file."""
+
+    record_file, name_file, meta_file = cache_files(file)
+    np.save(record_file, records)
+    with open(name_file, 'w', encoding="utf-8") as name_cache:
+        name_cache.writelines(f"{name}\n" for name in names)
+    update_cache_meta(file, types)
+
+
+def update_cache_meta(file, types):
+    """Marks the cache as matching the current state of the source file."""
+
+    file_stat = os.stat(file)
+    with open(cache_files(file)[2], 'w', encoding="utf-8") as meta:
+        json.dump({"version": CACHE_VERSION, "mtime_ns": file_stat.st_mtime_ns, "size": file_stat.st_size,
+                   "types": types}, meta)
+
+
+@profiler.timed("save_sources")
+def save_sources(types, sources, file=SOURCE_FILE):
+    """Saves the source list with current options."""
+
+    # Only rewrite the whole file if more than type and trace selections have changed
+    if update_sources_in_place(types, sources, file):
+        print("Sources saved!")
+        return 0
+
+    with open(file, 'w', newline='', encoding="utf-8") as csv_file:
+        csv_writer = csv.writer(csv_file, delimiter='|')
+        csv_writer.writerow(["Source Size", "Source Color"])    # Write type header row
+        for source_type in types:
+            csv_writer.writerow(source_type)
+
+        # Epoch and proper motion columns are only written when some source has them
+        astrometry = any(len(source) > 5 for source in sources)
+        csv_writer.writerow([])
+        csv_writer.writerow(["Source", "Right Ascension", "Declination", "Type", "Trace"]
+                            + (["Epoch", "PM RA", "PM Dec"] if astrometry else []))   # Write source header row
+        for source in sources:
+            if isinstance(source[1], str):
+                csv_writer.writerow([source[0], source[1], "", source[3], source[4]]
+                                    + ([J2000_YEAR, 0, 0] if astrometry else []))
+                continue
+
+            right_ascension = f"{int(source[1]):02d}:{int((source[1] % 1) * 60):02d}" \
+                              f":{((((source[1] % 1) * 60) % 1) * 60):06.3f}"
+
+            if source[2] >= 0:
+                declination = f"+{int(source[2]):02d}:{int((source[2] % 1) * 60):02d}" \
+                              f":{((((source[2] % 1) * 60) % 1) * 60):06.3f}"
+            else:
+                declination = f"-{int(-source[2]):02d}:{int((-source[2] % 1) * 60):02d}" \
+                              f":{((((-source[2] % 1) * 60) % 1) * 60):06.3f}"
+
+            row = [source[0], right_ascension, declination, source[3], source[4]]
+            if astrometry:
+                row += source[5:8] if len(source) > 5 else [J2000_YEAR, 0, 0]
+            csv_writer.writerow(row)
+
+    print("Sources saved!")
+    return 0
+
+
+def update_sources_in_place(types, sources, file=SOURCE_FILE):
+    """Writes changed type and trace fields directly into the source file and its cache.
+
+    Returns False without writing anything if the file has to be rewritten instead, i.e. if types, names or
+    coordinates, epochs or proper motions have changed, or if a new value does not fit in the space of the old one.
+    """
+
+    cache = read_cache(file)
+    if cache is None:
+        return False
+
+    cached_types, names, records = cache
+    if list(types) != cached_types or len(sources) != len(records) or [source[0] for source in sources] != names:
+        return False
+
+    body = np.fromiter((body_index(source[1]) if isinstance(source[1], str) else -1 for source in sources),
+                       dtype=np.int8, count=len(sources))
+    right_ascension = np.fromiter((0 if isinstance(source[1], str) else source[1] for source in sources),
+                                  dtype=np.float64, count=len(sources))
+    declination = np.fromiter((source[2] for source in sources), dtype=np.float64, count=len(sources))
+    if not (np.array_equal(body, records["body"]) and np.array_equal(right_ascension, records["right_ascension"])
+            and np.array_equal(declination, records["declination"])):
+        return False
+
+    astrometry = [source[5:8] if len(source) > 5 else (J2000_YEAR, 0, 0) for source in sources]
+    if not np.array_equal(np.array(astrometry, dtype=np.float64).reshape(-1, 3),
+                          np.stack((records["epoch"], records["pm_right_ascension"], records["pm_declination"]),
+                                   axis=-1)):
+        return False
+
+    source_types = np.fromiter((source[3] for source in sources), dtype=np.int32, count=len(sources))
+    traces = np.fromiter((source[4] for source in sources), dtype=np.int8, count=len(sources))
+    changed = np.flatnonzero((source_types != records["type"]) | (traces != records["trace"]))
+    if len(changed) == 0:
+        return True
+
+    fields = [(f"{source_types[i]}".encode(), f"{traces[i]}".encode()) for i in changed]
+    for i, (type_field, trace_field) in zip(changed, fields):
+        if (records["type_offset"][i] < 0 or len(type_field) != records["type_width"][i]
+                or len(trace_field) != records["trace_width"][i]):
+            return False
+
+    # The source file is only written once the cache can be updated along with it
+    try:
+        records = np.load(cache_files(file)[0], mmap_mode='r+')
+    except OSError:
+        return False
+
+    with open(file, 'r+b') as source_file:
+        for i, (type_field, trace_field) in zip(changed, fields):
+            source_file.seek(records["type_offset"][i])
+            source_file.write(type_field + b'|' + trace_field)
+
+    records["type"][changed] = source_types[changed]
+    records["trace"][changed] = traces[changed]
+    records.flush()
+    update_cache_meta(file, cached_types)
+
+    return True
@@ -0,0 +1,241 @@
+import argparse
+import math
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")   # Render without a display
+
+import numpy as np  # noqa: E402
+from PyQt6.QtCore import QBuffer, QByteArray, QIODevice, QLineF, QPointF, QRectF, QSize, Qt  # noqa: E402
+from PyQt6.QtGui import QColor, QFont, QFontMetricsF, QGuiApplication, QImage, QPainter, QPen, QPicture  # noqa: E402
+from PyQt6.QtSvg import QSvgGenerator  # noqa: E402
+
+from catalog import SOURCE_FILE, load_config, load_sites, load_sources  # noqa: E402
+from gui_elements import MarkerLayer  # noqa: E402
+from labels import LabelGrid  # noqa: E402
+from positions import BODY_PATH_STEP, PositionEngine, night_window, parse_local_time  # noqa: E402
+
+CHART_MARGIN = 30   # Space around the horizon circle in pixels, for direction labels and the title
+BACKGROUND_COLOR = "#FFFFFF"
+
+_worker_state = {}  # Chart renderer of a worker process
+
+
+def draw_grid(painter, degree_scaling, elevation_range):
+    """Draws elevation circles, azimuth lines, directions and elevation limits of the sky chart around the zenith."""
+
+    painter.setBrush(Qt.BrushStyle.NoBrush)
+    painter.setPen(QPen(QColor("#A0A0A0"), 1))
+    small_font = QFont()
+    small_font.setPointSize(6)
+    font = QFont()
+    font.setPointSize(8)
+
+    # Elevation circles every 15° and their labels
+    painter.setFont(small_font)
+    for i in range(6):
+        radius = (90 - 15 * i) * degree_scaling
+        painter.drawEllipse(QPointF(0, 0), radius, radius)
+        painter.drawText(QRectF(2, -15 * (i + 1) * degree_scaling, 40, 16),
+                         Qt.AlignmentFlag.AlignLeft | Qt.AlignmentFlag.AlignVCenter, f"{90 - 15 * (i + 1)}°")
+
+    # Azimuth lines every 30°
+    for i in range(12):
+        angle = i * (2 * math.pi / 12)
+        painter.drawLine(QLineF(0, 0, math.cos(angle) * 90 * degree_scaling, math.sin(angle) * 90 * degree_scaling))
+
+    painter.setFont(font)
+    for x, y, direction in ((0, -1, "N"), (0, 1, "S"), (-1, 0, "E"), (1, 0, "W")):
+        center = QPointF(x * (90 * degree_scaling + 10), y * (90 * degree_scaling + 10))
+        painter.drawText(QRectF(center.x() - 10, center.y() - 10, 20, 20), Qt.AlignmentFlag.AlignCenter, direction)
+
+    # Minimum and maximum elevation limits
+    painter.setPen(QPen(QColor("#FF0000"), 3))
+    radius = (90 - elevation_range[0]) * degree_scaling
+    painter.drawEllipse(QPointF(0, 0), radius, radius)
+    pen = QPen(QColor("#FF0000"), 2)
+    pen.setStyle(Qt.PenStyle.DashLine)
+    painter.setPen(pen)
+    radius = (90 - elevation_range[1]) * degree_scaling
+    painter.drawEllipse(QPointF(0, 0), radius, radius)
+
+
+def grid_picture(degree_scaling, elevation_range):
+    """Returns the static chart grid recorded once, replayed into SVG frames and the background of raster frames."""
+
+    picture = QPicture()
+    painter = QPainter(picture)
+    draw_grid(painter, degree_scaling, elevation_range)
+    painter.end()
+
+    return picture
+
+
+class ChartRenderer:
+    """Renders sky chart images of one site at given times, like the sky view of the GUI."""
+
+    def __init__(self, types, sources, site, degree_scaling, grid=None, vector_markers=False):
+        self.site = site
+        self.size = int(math.ceil((90 * degree_scaling + CHART_MARGIN) * 2))
+        self.grid = grid_picture(degree_scaling, (site[3], site[4])) if grid is None else grid
+        self.grid_image = None  # Grid on the background, rendered once and copied as the start of raster frames
+
+        self.engine = PositionEngine(sources, (site[1], site[2]), degree_scaling)
+        self.rising = self.engine.reaches_elevation(site[3])
+        self.layer = MarkerLayer(types, sources, (0, self.engine.pole_offset()), self.engine.path_diameters(),
+                                 vector_markers=vector_markers)
+
+        # Place labels of traced sources like the GUI, keeping the grid between consecutive frames
+        label_metrics = QFontMetricsF(self.layer.label_font)
+        self.label_grid = LabelGrid(lambda i: label_metrics.horizontalAdvance(sources[i][0]) + 4,
+                                    label_metrics.height() + 2)
+        self.traced = np.array([source[4] for source in sources], dtype=bool)
+        self.path_window = None     # Night that paths of moving sources were drawn for
+        self.label_priority = np.array([types[source[3]][0] * 2 + source[4] for source in sources], dtype=np.float64)
+
+    def render(self, local_time, output):
+        """Renders the chart at given time into an image file, or an SVG file if the name ends with .svg."""
+
+        day = self.engine.day
+        x, y, shown = self.engine.sky_positions(local_time, self.site[3])
+        if self.engine.day != day:
+            # Source places of a new day, as moved by precession and proper motion
+            self.rising = self.engine.reaches_elevation(self.site[3])
+            self.layer.path_diameters = self.engine.path_diameters()
+        if night_window(local_time) != self.path_window and len(self.engine.body_indices):
+            self.path_window = night_window(local_time)
+            self.layer.set_body_paths(self.engine.body_indices,
+                                      *self.engine.body_paths(*self.path_window, BODY_PATH_STEP))
+        shown &= self.rising
+        self.layer.set_positions(x, y, shown)
+        self.layer.set_labels(self.label_grid.update(x, y, shown & self.traced, self.label_priority))
+
+        if output.lower().endswith(".svg"):
+            device = QSvgGenerator()
+            device.setFileName(output)
+            device.setSize(QSize(self.size, self.size))
+            device.setViewBox(QRectF(0, 0, self.size, self.size))
+        else:
+            if self.grid_image is None:
+                self.grid_image = QImage(self.size, self.size, QImage.Format.Format_ARGB32)
+                self.grid_image.fill(QColor(BACKGROUND_COLOR))
+                painter = QPainter(self.grid_image)
+                painter.setRenderHint(QPainter.RenderHint.Antialiasing)
+                painter.translate(self.size / 2, self.size / 2)
+                painter.drawPicture(0, 0, self.grid)
+                painter.end()
+            device = self.grid_image.copy()
+
+        painter = QPainter(device)
+        painter.setRenderHint(QPainter.RenderHint.Antialiasing)
+        painter.translate(self.size / 2, self.size / 2)
+        if isinstance(device, QSvgGenerator):
+            painter.drawPicture(0, 0, self.grid)
+        self.layer.paint(painter, None)
+
+        painter.setPen(QColor("#000000"))
+        painter.setFont(QFont())
+        painter.drawText(QRectF(-self.size / 2 + 5, -self.size / 2 + 2, self.size - 10, 20),
+                         Qt.AlignmentFlag.AlignLeft,
+                         f"{self.site[0]}  {time.strftime('%Y-%m-%d %H:%M', time.localtime(local_time))}".strip())
+        painter.end()
+
+        if isinstance(device, QImage) and not device.save(output):
+            raise OSError(f"Could not write {output}")
+        return output
+
+
+def frame_output(output, index):
+    """Returns the file name of a numbered time-lapse frame."""
+
+    root, extension = os.path.splitext(output)
+    return f"{root}_{index:04d}{extension}"
+
+
+def _init_worker(source_file, site, degree_scaling, grid_data, vector_markers):
+    """Creates the chart renderer once per worker process, replaying the grid recorded by the main process."""
+
+    _worker_state["app"] = QGuiApplication.instance() or QGuiApplication([])
+    grid_bytes = QByteArray(grid_data)  # Kept alive while the picture is loaded from it
+    buffer = QBuffer(grid_bytes)
+    buffer.open(QIODevice.OpenModeFlag.ReadOnly)
+    grid = QPicture()
+    grid.load(buffer)
+
+    types, sources = load_sources(source_file)
+    _worker_state["renderer"] = ChartRenderer(types, sources, site, degree_scaling, grid, vector_markers)
+
+
+def _render_frame(local_time, output):
+    """Renders one frame in a worker process."""
+
+    return _worker_state["renderer"].render(local_time, output)
+
+
+def render_frames(source_file, site, degree_scaling, times, outputs, workers=None):
+    """Renders charts at given times into given files in parallel worker processes, yielding finished files.
+
+    Consecutive frames are handed to the same worker, so that its label placement carries over between them.
+    """
+
+    vector_markers = outputs[0].lower().endswith(".svg")
+    # The grid is serialized through a buffer, as QPicture.data() is cut off at the first NUL byte in PyQt
+    grid_bytes = QByteArray()
+    buffer = QBuffer(grid_bytes)
+    buffer.open(QIODevice.OpenModeFlag.WriteOnly)
+    grid_picture(degree_scaling, (site[3], site[4])).save(buffer)
+    buffer.close()
+    workers = min(len(outputs), workers or os.cpu_count() or 1)
+
+    # Workers are started fresh instead of forked, as Qt can not be used in a forked process
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"),
+                             initializer=_init_worker,
+                             initargs=(source_file, site, degree_scaling, grid_bytes.data(), vector_markers)
+                             ) as executor:
+        yield from executor.map(_render_frame, times, outputs, chunksize=max(1, len(outputs) // (workers * 4)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Render sky charts or time-lapse frames without the GUI.")
+    parser.add_argument("time", type=parse_local_time, help='local time of the chart, "YYYY-MM-DD HH:MM"')
+    parser.add_argument("output", help="output image file, e.g. chart.png or chart.svg")
+    parser.add_argument("--end", type=parse_local_time, default=None,
+                        help='local end time of a time-lapse, "YYYY-MM-DD HH:MM", with numbered output files')
+    parser.add_argument("--step", type=float, default=10, help="time-lapse step in minutes")
+    parser.add_argument("--scale", type=float, default=None, help="pixels per degree instead of the configured one")
+    parser.add_argument("--site", default=None, help="name of a configured site to use instead of the first one")
+    parser.add_argument("--sources", default=SOURCE_FILE, help="source file to read instead of the default")
+    parser.add_argument("--config", default=None, help="config file to read instead of the default")
+    parser.add_argument("--workers", type=int, default=None, help="number of rendering processes")
+    args = parser.parse_args()
+
+    config = load_config() if args.config is None else load_config(args.config)
+    sites = load_sites() if args.config is None else load_sites(args.config)
+    site = next((site for site in sites if site[0] == args.site), None) if args.site is not None else sites[0]
+    if site is None:
+        parser.error(f"unknown site: {args.site}")
+    degree_scaling = config[6] if args.scale is None else args.scale
+    if args.end is not None and (args.step <= 0 or args.end < args.time):
+        parser.error("time-lapse must have a positive step and end after start")
+
+    app = QGuiApplication.instance() or QGuiApplication([])
+    types, sources = load_sources(args.sources)     # Also brings the binary cache up to date for the workers
+
+    if args.end is None:
+        ChartRenderer(types, sources, site, degree_scaling,
+                      vector_markers=args.output.lower().endswith(".svg")).render(args.time, args.output)
+        print(f"Chart written to {args.output}")
+        return
+
+    times = (args.time + np.arange(int((args.end - args.time) // (args.step * 60)) + 1) * args.step * 60).tolist()
+    outputs = [frame_output(args.output, i) for i in range(len(times))]
+    os.makedirs(os.path.dirname(args.output) or '.', exist_ok=True)
+    for count, _ in enumerate(render_frames(args.sources, site, degree_scaling, times, outputs, args.workers), 1):
+        print(f"\rRendered {count}/{len(outputs)} frames", end='', flush=True)
+    print(f"\nFrames written to {outputs[0]} ... {outputs[-1]}")
+
+
+if __name__ == '__main__':
+    main()
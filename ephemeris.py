@@ -0,0 +1,241 @@
+import calendar
+import functools
+import os
+
+import numpy as np
+
+from precession import J2000_YEAR, day_number, precession_matrix
+from sidereal import J2000_JD, UNIX_EPOCH_JD
+
+EPHEMERIS_CACHE = "ephemeris.cache"     # Prefix of the yearly coefficient table files
+EPHEMERIS_VERSION = 1
+
+# Solar system bodies as (name, segment length in days, Chebyshev degree), in the order of their body numbers
+BODIES = (("Sun", 32, 12), ("Moon", 4, 14), ("Mercury", 8, 14), ("Venus", 16, 12), ("Mars", 16, 12),
+          ("Jupiter", 32, 10), ("Saturn", 32, 10), ("Uranus", 32, 10), ("Neptune", 32, 10))
+SEGMENT_DAYS = np.array([segment_days for _, segment_days, _ in BODIES], dtype=np.float64)
+
+# Keplerian elements a (AU), e, I, L, longitude of perihelion, longitude of ascending node (degrees) at J2000 and
+# their rates per Julian century, for the J2000 ecliptic and equinox (Standish, valid 1800-2050)
+PLANET_ELEMENTS = {
+    "Mercury": ((0.38709927, 0.20563593, 7.00497902, 252.25032350, 77.45779628, 48.33076593),
+                (0.00000037, 0.00001906, -0.00594749, 149472.67411175, 0.16047689, -0.12534081)),
+    "Venus": ((0.72333566, 0.00677672, 3.39467605, 181.97909950, 131.60246718, 76.67984255),
+              (0.00000390, -0.00004107, -0.00078890, 58517.81538729, 0.00268329, -0.27769418)),
+    "Earth": ((1.00000261, 0.01671123, -0.00001531, 100.46457166, 102.93768193, 0.0),
+              (0.00000562, -0.00004392, -0.01294668, 35999.37244981, 0.32327364, 0.0)),
+    "Mars": ((1.52371034, 0.09339410, 1.84969142, -4.55343205, -23.94362959, 49.55953891),
+             (0.00001847, 0.00007882, -0.00813131, 19140.30268499, 0.44441088, -0.29257343)),
+    "Jupiter": ((5.20288700, 0.04838624, 1.30439695, 34.39644051, 14.72847983, 100.47390909),
+                (-0.00011607, -0.00013253, -0.00183714, 3034.74612775, 0.21252668, 0.20469106)),
+    "Saturn": ((9.53667594, 0.05386179, 2.48599187, 49.95424423, 92.59887831, 113.66242448),
+               (-0.00125060, -0.00050991, 0.00193609, 1222.49362201, -0.41897216, -0.28867794)),
+    "Uranus": ((19.18916464, 0.04725744, 0.77263783, 313.23810451, 170.95427630, 74.01692503),
+               (-0.00196176, -0.00004397, -0.00242939, 428.48202785, 0.40805281, 0.04240589)),
+    "Neptune": ((30.06992276, 0.00859048, 1.77004347, -55.12002969, 44.96476227, 131.78422574),
+                (0.00026291, 0.00005105, 0.00035372, 218.45945325, -0.32241464, -0.00508664)),
+}
+J2000_OBLIQUITY = 23.43928     # Obliquity of the J2000 ecliptic in degrees
+LIGHT_AU_PER_DAY = 173.1446
+
+# Lunar longitude, latitude and parallax terms as (amplitude, phase, rate per century) in degrees (low precision
+# formulae of the Astronomical Almanac, about 0.3° accurate)
+MOON_LONGITUDE = ((6.29, 134.9, 477198.85), (-1.27, 259.2, -413335.38), (0.66, 235.7, 890534.23),
+                  (0.21, 269.9, 954397.70), (-0.19, 357.5, 35999.05), (-0.11, 186.6, 966404.05))
+MOON_LATITUDE = ((5.13, 93.3, 483202.03), (0.28, 228.2, 960400.87), (-0.28, 318.3, 6003.18),
+                 (-0.17, 217.6, -407332.20))
+MOON_PARALLAX = ((0.9508, 90.0, 0.0), (0.0518, 224.9, 477198.85), (0.0095, 349.2, -413335.38),
+                 (0.0078, 325.7, 890534.23), (0.0028, 359.9, 954397.70))
+
+
+def body_index(name):
+    """Returns the body number of a solar system body name, ignoring case, or -1 for other names."""
+
+    return next((i for i, body in enumerate(BODIES) if body[0].lower() == name.strip().lower()), -1)
+
+
+def julian_centuries(unix_time):
+    """Returns Julian centuries since J2000 for Unix timestamps, taking UTC as TT."""
+
+    return (np.asarray(unix_time, dtype=np.float64) / 86400 + UNIX_EPOCH_JD - J2000_JD) / 36525
+
+
+def periodic_terms(terms, centuries):
+    """Returns the sum of amplitude * sin(phase + rate * T) terms in degrees."""
+
+    return sum(amplitude * np.sin(np.radians(phase + rate * centuries)) for amplitude, phase, rate in terms)
+
+
+def ecliptic_to_equatorial(vectors, obliquity):
+    """Rotates ecliptic vectors shaped (3, ...) to the equator about the x axis by given obliquity in degrees."""
+
+    cos_obliquity, sin_obliquity = np.cos(np.radians(obliquity)), np.sin(np.radians(obliquity))
+    return np.stack((vectors[0], cos_obliquity * vectors[1] - sin_obliquity * vectors[2],
+                     sin_obliquity * vectors[1] + cos_obliquity * vectors[2]))
+
+
+def heliocentric_vectors(planet, centuries):
+    """Returns heliocentric J2000 ecliptic positions in AU of a planet or the Earth-Moon barycenter."""
+
+    elements, rates = PLANET_ELEMENTS[planet]
+    a, e, inclination, longitude, perihelion, node = (element + rate * centuries
+                                                      for element, rate in zip(elements, rates))
+    argument = np.radians(perihelion - node)
+    node, inclination = np.radians(node), np.radians(inclination)
+    anomaly = np.radians((longitude - perihelion + 180) % 360 - 180)
+
+    # Solve Kepler's equation for the eccentric anomaly
+    eccentric_anomaly = anomaly + e * np.sin(anomaly)
+    for _ in range(6):
+        eccentric_anomaly -= ((eccentric_anomaly - e * np.sin(eccentric_anomaly) - anomaly)
+                              / (1 - e * np.cos(eccentric_anomaly)))
+    x = a * (np.cos(eccentric_anomaly) - e)
+    y = a * np.sqrt(1 - e * e) * np.sin(eccentric_anomaly)
+
+    cos_argument, sin_argument = np.cos(argument), np.sin(argument)
+    cos_node, sin_node = np.cos(node), np.sin(node)
+    cos_inclination = np.cos(inclination)
+    return np.stack(((cos_argument * cos_node - sin_argument * sin_node * cos_inclination) * x
+                     - (sin_argument * cos_node + cos_argument * sin_node * cos_inclination) * y,
+                     (cos_argument * sin_node + sin_argument * cos_node * cos_inclination) * x
+                     + (cos_argument * cos_node * cos_inclination - sin_argument * sin_node) * y,
+                     np.sin(inclination) * (sin_argument * x + cos_argument * y)))
+
+
+def moon_vectors(unix_time):
+    """Returns geocentric J2000 equatorial positions of the Moon in Earth radii."""
+
+    centuries = julian_centuries(unix_time)
+    longitude = np.radians(218.32 + 481267.881 * centuries + periodic_terms(MOON_LONGITUDE, centuries))
+    latitude = np.radians(periodic_terms(MOON_LATITUDE, centuries))
+    distance = 1 / np.sin(np.radians(periodic_terms(MOON_PARALLAX, centuries)))
+
+    # Coordinates are for the ecliptic and equinox of date, so are precessed back to J2000 day by day
+    vectors = ecliptic_to_equatorial(distance * np.stack((np.cos(latitude) * np.cos(longitude),
+                                                          np.cos(latitude) * np.sin(longitude), np.sin(latitude))),
+                                     23.439291 - 0.0130042 * centuries)
+    days, day_groups = np.unique(np.floor(np.asarray(unix_time) / 86400).astype(np.int64), return_inverse=True)
+    matrices = np.stack([precession_matrix(J2000_YEAR, int(day)).T for day in days])
+
+    return np.einsum('nij,jn->in', matrices[day_groups.ravel()], vectors.reshape(3, -1)).reshape(vectors.shape)
+
+
+def geocentric_vectors(body, unix_time):
+    """Returns geocentric J2000 equatorial positions of a body from its analytic theory, shaped (3, time)."""
+
+    name = BODIES[body][0]
+    if name == "Moon":
+        return moon_vectors(unix_time)
+
+    centuries = julian_centuries(unix_time)
+    earth = heliocentric_vectors("Earth", centuries)
+    if name == "Sun":
+        return ecliptic_to_equatorial(-earth, J2000_OBLIQUITY)
+
+    # Planets are seen where they were when their light left
+    light_time = np.linalg.norm(heliocentric_vectors(name, centuries) - earth, axis=0) / LIGHT_AU_PER_DAY
+    return ecliptic_to_equatorial(heliocentric_vectors(name, centuries - light_time / 36525) - earth,
+                                  J2000_OBLIQUITY)
+
+
+def year_start(year):
+    """Returns the Unix timestamp of the start of a UTC year."""
+
+    return calendar.timegm((year, 1, 1, 0, 0, 0))
+
+
+def fit_tables(year):
+    """Returns Chebyshev coefficients of all bodies over a UTC year and the number of segments of each body.
+
+    Each body is sampled at the Chebyshev nodes of consecutive segments covering the year. Coefficients are
+    shaped (body, segment, 3, degree + 1), zero padded to the longest segment count and highest degree.
+    """
+
+    start, days = year_start(year), (year_start(year + 1) - year_start(year)) / 86400
+    segment_counts = np.array([int(np.ceil(days / segment_days)) for _, segment_days, _ in BODIES])
+    coefficients = np.zeros((len(BODIES), segment_counts.max(), 3, max(degree for _, _, degree in BODIES) + 1))
+    for body, (_, segment_days, degree) in enumerate(BODIES):
+        nodes = np.arange(degree + 1)
+        node_angles = np.pi * (nodes + 0.5) / (degree + 1)
+        segments = np.arange(segment_counts[body])
+        times = start + ((segments[:, None] + (np.cos(node_angles) + 1) / 2) * segment_days * 86400)
+
+        values = geocentric_vectors(body, times)
+        body_coefficients = (np.einsum('isk,jk->sij', values, np.cos(np.outer(nodes, node_angles)))
+                             * (2 / (degree + 1)))
+        body_coefficients[..., 0] /= 2
+        coefficients[body, :len(segments), :, :degree + 1] = body_coefficients
+
+    return coefficients, segment_counts
+
+
+@functools.lru_cache(maxsize=4)
+def year_tables(year):
+    """Returns the coefficient tables of a UTC year, read from the disk cache or fitted and cached.
+
+    Tables are written to a temporary file first, as several processes may fit the same year at once.
+    """
+
+    file = f"{EPHEMERIS_CACHE}.{year}.npz"
+    try:
+        with np.load(file) as cache:
+            if int(cache["version"]) == EPHEMERIS_VERSION:
+                return cache["coefficients"], cache["segment_counts"]
+    except (OSError, ValueError, KeyError):
+        pass
+
+    coefficients, segment_counts = fit_tables(year)
+    try:
+        temporary_file = f"{file}.{os.getpid()}.npz"
+        np.savez(temporary_file, version=EPHEMERIS_VERSION, coefficients=coefficients,
+                 segment_counts=segment_counts)
+        os.replace(temporary_file, file)
+    except OSError:
+        pass    # Tables are still used without the cache, e.g. from a read-only directory
+
+    return coefficients, segment_counts
+
+
+def body_vectors(bodies, unix_time):
+    """Returns geocentric J2000 equatorial unit vectors of bodies shaped (3, *time shape, body).
+
+    Positions are interpolated from the yearly Chebyshev tables with Clenshaw's recurrence, evaluating all bodies
+    and times together, so they only cost a short polynomial instead of the full theory.
+    """
+
+    bodies = np.asarray(bodies, dtype=np.int64)
+    times = np.asarray(unix_time, dtype=np.float64)
+    flat_times = times.ravel()
+    segment_days = SEGMENT_DAYS[bodies]
+    vectors = np.empty((len(flat_times), len(bodies), 3))
+
+    years = flat_times.astype(np.int64).astype('datetime64[s]').astype('datetime64[Y]').astype(np.int64) + 1970
+    for year in np.unique(years).tolist():
+        in_year = years == year if len(flat_times) > 1 else slice(None)
+        coefficients, segment_counts = year_tables(year)
+        days = (flat_times[in_year, None] - year_start(year)) / 86400
+        segments = np.clip((days // segment_days).astype(np.int64), 0, segment_counts[bodies] - 1)
+        tau = (2 * (days / segment_days - segments) - 1)[..., None]
+        segment_coefficients = coefficients[bodies, segments]   # (time, body, 3, degree + 1)
+
+        previous = current = 0
+        for k in range(segment_coefficients.shape[-1] - 1, 0, -1):
+            previous, current = current, 2 * tau * current - previous + segment_coefficients[..., k]
+        vectors[in_year] = tau * current - previous + segment_coefficients[..., 0]
+
+    vectors /= np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return np.moveaxis(vectors, -1, 0).reshape((3,) + times.shape + (len(bodies),))
+
+
+def body_places(bodies, unix_time):
+    """Returns right ascensions in hours and declinations in degrees of bodies for the mean equator of date.
+
+    Results are shaped (*time shape, body), precessed with the matrix of the first given time.
+    """
+
+    vectors = body_vectors(bodies, unix_time)
+    matrix = precession_matrix(J2000_YEAR, day_number(np.ravel(unix_time)[0]))
+    vectors = np.einsum('ij,j...->i...', matrix, vectors)
+
+    return (np.degrees(np.arctan2(vectors[1], vectors[0])) / 15 % 24,
+            np.degrees(np.arcsin(np.clip(vectors[2], -1, 1))))
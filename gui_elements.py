@@ -1,9 +1,14 @@
 import time
 
-from PyQt6.QtCore import Qt
-from PyQt6.QtGui import QPen, QBrush, QColor, QFont
-from PyQt6.QtWidgets import (QGraphicsLineItem, QGraphicsEllipseItem, QGraphicsTextItem,
-                             QSpinBox, QLineEdit)
+import numpy as np
+from PyQt6 import sip
+from PyQt6.QtCore import Qt, QAbstractListModel, QModelIndex, QPointF, QRectF, QThread, pyqtSignal
+from PyQt6.QtGui import QPen, QBrush, QColor, QFont, QPainter, QPainterPath, QPixmap, QPolygonF
+from PyQt6.QtWidgets import (QGraphicsItem, QGraphicsLineItem, QGraphicsEllipseItem, QGraphicsPathItem,
+                             QGraphicsTextItem, QSpinBox, QLineEdit)
+
+from importer import import_batches
+from instrumentation import profiler
 
 
 class LineBetween(QGraphicsLineItem):
@@ -20,6 +25,35 @@ class LineBetween(QGraphicsLineItem):
         self.setPen(pen)
 
 
+def path_polygon(x, y):
+    """Returns a polyline through given point coordinates."""
+
+    return QPolygonF([QPointF(point_x, point_y) for point_x, point_y in zip(x.tolist(), y.tolist())])
+
+
+class CurvedPath(QGraphicsPathItem):
+    """GUI polyline through given points, e.g. the path of a moving source."""
+
+    def __init__(self, x, y, outline_width=1, outline_color="#000000", dashed=False, layer=0):
+        super().__init__()
+
+        self.setZValue(layer)
+        pen = QPen(QColor(outline_color))
+        pen.setWidth(outline_width)
+        if dashed:
+            pen.setStyle(Qt.PenStyle.DashLine)  # Set dashed line style
+        self.setPen(pen)
+        self.set_points(x, y)
+
+    def set_points(self, x, y):
+        """Replaces the points of the polyline."""
+
+        path = QPainterPath()
+        path.addPolygon(path_polygon(x, y))
+        self.setPos(0, 0)
+        self.setPath(path)
+
+
 class CenteredCircle(QGraphicsEllipseItem):
     """GUI circle centered on given point."""
 
@@ -45,10 +79,169 @@ class CenteredCircle(QGraphicsEllipseItem):
         """Handles clicking on the GUI element."""
 
         if self.source_id is not None:
-            for menu_item in self.parent_scene.menu_items:
-                if menu_item[0] == self.source_id:
-                    menu_item[2].toggle()   # Toggle source visibility checkmark
-                    break
+            self.parent_scene.source_model.toggle_trace(self.source_id)    # Toggle source visibility
+        else:
+            event.ignore()
+
+
+class ItemContainer(QGraphicsItem):
+    """Invisible GUI item grouping child items, e.g. to show or hide them together."""
+
+    def __init__(self, layer=0):
+        super().__init__()
+
+        self.setZValue(layer)
+        self.setFlag(QGraphicsItem.GraphicsItemFlag.ItemHasNoContents)
+
+    def boundingRect(self):
+        return QRectF()
+
+    def paint(self, painter, option, widget=None):
+        pass
+
+
+class MarkerLayer(QGraphicsItem):
+    """Single GUI item painting all source markers, traces and labels from position arrays."""
+
+    def __init__(self, types, sources, path_center, path_diameters, parent_scene=None, layer=2, clip_radius=None,
+                 vector_markers=False):
+        super().__init__()
+
+        self.setZValue(layer)
+        self.setFlag(QGraphicsItem.GraphicsItemFlag.ItemUsesExtendedStyleOption)   # Provide exposed area to paint
+        self.types = types
+        self.sources = sources
+        self.parent_scene = parent_scene
+        self.path_center = path_center
+        self.path_diameters = path_diameters
+        self.clip_radius = clip_radius  # Radius around the zenith outside which nothing is painted
+        self.vector_markers = vector_markers    # Draw markers as shapes instead of images, e.g. for SVG output
+        self.source_types = np.array([source[3] for source in sources], dtype=np.int64)
+        self.traces = np.array([source[4] for source in sources], dtype=bool)
+        self.x = np.zeros(len(sources))
+        self.y = np.zeros(len(sources))
+        self.shown = np.ones(len(sources), dtype=bool)
+        self.labeled = np.zeros(len(sources), dtype=bool)
+        self.body_paths = {}    # Polylines of moving sources, drawn instead of their path circles
+
+        self.label_font = QFont()
+        self.label_font.setPointSize(8)
+        self.sprites = [marker_sprite(diameter, color) for diameter, color in types]
+        self.bounding_rect = QRectF()
+        self.update_bounds()
+
+    def update_bounds(self):
+        """Recomputes the area covered by all source paths."""
+
+        self.prepareGeometryChange()
+        radius = (float(self.path_diameters.max()) / 2 if len(self.path_diameters) else 0) + 40
+        self.bounding_rect = QRectF(self.path_center[0] - radius, self.path_center[1] - radius, radius * 2, radius * 2)
+
+    def add_sources(self, sources, path_diameters):
+        """Adds markers for sources appended to the source list."""
+
+        self.path_diameters = path_diameters
+        self.source_types = np.concatenate((self.source_types, [source[3] for source in sources])).astype(np.int64)
+        self.traces = np.concatenate((self.traces, [source[4] for source in sources])).astype(bool)
+        self.labeled = np.concatenate((self.labeled, np.zeros(len(sources), dtype=bool)))
+        self.update_bounds()
+
+    def update_sources(self, first=0, last=None):
+        """Copies trace and type selections of given source index range from the source list."""
+
+        last = len(self.sources) - 1 if last is None else last
+        self.source_types[first:last + 1] = [source[3] for source in self.sources[first:last + 1]]
+        self.traces[first:last + 1] = [source[4] for source in self.sources[first:last + 1]]
+        self.update()
+
+    def set_positions(self, x, y, shown=None):
+        """Moves all markers to given chart positions, hiding markers and labels of sources not shown."""
+
+        self.x = x
+        self.y = y
+        self.shown = np.ones(len(x), dtype=bool) if shown is None else shown
+        self.update()
+
+    def set_body_paths(self, indices, x, y):
+        """Sets the paths of moving sources of given indices from chart positions shaped (time, source)."""
+
+        self.body_paths = {i: path_polygon(x[:, column], y[:, column]) for column, i in enumerate(indices.tolist())}
+        self.update()
+
+    def set_labels(self, labeled):
+        """Selects which sources have their label painted."""
+
+        self.labeled = labeled
+        self.update()
+
+    def source_at(self, point):
+        """Returns index of the topmost source whose marker contains given point, or None."""
+
+        if len(self.x) == 0:
+            return None
+
+        radius = np.array([source_type[0] for source_type in self.types], dtype=np.float64)[self.source_types] / 2 + 1
+        distance = (self.x - point.x()) ** 2 + (self.y - point.y()) ** 2
+        hits = np.flatnonzero((distance <= radius ** 2) & self.shown)
+
+        return int(hits[-1]) if len(hits) else None
+
+    def boundingRect(self):
+        return self.bounding_rect
+
+    @profiler.timed("marker_layer_paint")
+    def paint(self, painter, option, widget=None):
+        traced = np.flatnonzero(self.traces).tolist()
+        if self.clip_radius is not None:
+            clip_path = QPainterPath()
+            clip_path.addEllipse(QPointF(0, 0), self.clip_radius, self.clip_radius)
+            painter.setClipPath(clip_path, Qt.ClipOperation.IntersectClip)
+
+        # Draw traced source paths
+        pen = QPen(QColor("#00A000"))
+        pen.setWidth(1)
+        pen.setStyle(Qt.PenStyle.DashLine)
+        painter.setPen(pen)
+        painter.setBrush(Qt.BrushStyle.NoBrush)
+        for i in traced:
+            if i in self.body_paths:
+                painter.drawPolyline(self.body_paths[i])
+                continue
+            diameter = float(self.path_diameters[i])
+            painter.drawEllipse(QRectF(self.path_center[0] - diameter / 2, self.path_center[1] - diameter / 2,
+                                       diameter, diameter))
+
+        # Stamp the pre-rendered marker image of each type onto all its exposed sources in one call
+        exposed = self.bounding_rect if option is None else option.exposedRect
+        for type_index, sprite in enumerate(self.sprites):
+            offset = sprite.width() / 2
+            in_type = ((self.source_types == type_index) & self.shown
+                       & (self.x > exposed.left() - offset) & (self.x < exposed.right() + offset)
+                       & (self.y > exposed.top() - offset) & (self.y < exposed.bottom() + offset))
+
+            if self.vector_markers:
+                painter.setPen(QPen(QColor("#000000"), 1))
+                painter.setBrush(QBrush(QColor(self.types[type_index][1])))
+                radius = self.types[type_index][0] / 2
+                for x, y in zip(self.x[in_type].tolist(), self.y[in_type].tolist()):
+                    painter.drawEllipse(QPointF(x, y), radius, radius)
+                continue
+
+            painter.drawPixmapFragments(pixmap_fragments(self.x[in_type], self.y[in_type], sprite), sprite)
+
+        # Draw labels picked by the scene's label placement
+        painter.setPen(QColor("#0000F0"))
+        painter.setFont(self.label_font)
+        for i in np.flatnonzero(self.labeled & self.shown).tolist():
+            painter.drawText(QRectF(self.x[i] - 100, self.y[i] + 5, 200, 20), Qt.AlignmentFlag.AlignCenter,
+                             self.sources[i][0])
+
+    def mousePressEvent(self, event):
+        """Handles clicking on a marker."""
+
+        source_id = self.source_at(event.pos())
+        if source_id is not None:
+            self.parent_scene.source_model.toggle_trace(source_id)    # Toggle source visibility
         else:
             event.ignore()
 
@@ -67,15 +260,29 @@ class Text(QGraphicsTextItem):
         font.setPointSize(font_size)
         self.setFont(font)
 
+        self.anchor = (x, y)
+        self.alignment = alignment
+        self.align()
+
+    def align(self):
+        """Positions the text relative to its anchor point."""
+
         # Get text size and center it
+        x, y = self.anchor
         text_rect = self.boundingRect()
-        if alignment == 0:
+        if self.alignment == 0:
             self.setPos(x - text_rect.width() / 2, y - text_rect.height() / 2)
-        elif alignment == -1:
+        elif self.alignment == -1:
             self.setPos(x, y - text_rect.height() / 2)
-        elif alignment == 1:
+        elif self.alignment == 1:
             self.setPos(x - text_rect.width(), y - text_rect.height() / 2)
 
+    def set_text(self, text):
+        """Replaces the text while keeping its alignment."""
+
+        self.setPlainText(text)
+        self.align()
+
 
 class IntegerSelector(QSpinBox):
     """GUI widget for integer selection."""
@@ -124,3 +331,143 @@ class TextInput(QLineEdit):
 
         else:
             super().keyPressEvent(event)
+
+
+class SearchInput(QLineEdit):
+    """GUI widget filtering the source menu by name as text is typed."""
+
+    def __init__(self, width=150, height=30, max_length=100, font_size=12, parent_scene=None):
+        super().__init__()
+        self.setFixedSize(width, height)
+        self.setMaxLength(max_length)
+        default_font = self.font()
+        default_font.setPointSize(font_size)
+        self.setFont(default_font)
+        self.setPlaceholderText("Search sources")
+        self.parent_scene = parent_scene
+        self.textChanged.connect(self.parent_scene.search_sources)
+
+    def keyPressEvent(self, event):
+        """Selects the first match with enter and clears the search with escape."""
+
+        if event.key() in (Qt.Key.Key_Return, Qt.Key.Key_Enter):
+            if self.parent_scene.menu_rows is not None and len(self.parent_scene.menu_rows):
+                self.parent_scene.select_source(int(self.parent_scene.menu_rows[0]))
+            self.clearFocus()
+        elif event.key() == Qt.Key.Key_Escape:
+            self.clear()
+            self.clearFocus()
+        else:
+            super().keyPressEvent(event)
+
+
+def pixmap_fragments(x, y, pixmap):
+    """Returns fragments drawing a whole pixmap centered on each given point, filled directly from the arrays."""
+
+    fragments = sip.array(QPainter.PixmapFragment, len(x))
+    if len(x):
+        # Fragments are x, y, source left, top, width, height, x and y scale, rotation and opacity as doubles
+        values = np.frombuffer(memoryview(fragments), dtype=np.float64).reshape(len(x), 10)
+        values[:] = (0, 0, 0, 0, pixmap.width(), pixmap.height(), 1, 1, 0, 1)
+        values[:, 0] = x
+        values[:, 1] = y
+
+    return fragments
+
+
+def marker_sprite(diameter, color):
+    """Returns an image of a source marker with the same look as a CenteredCircle marker."""
+
+    sprite = QPixmap(diameter + 2, diameter + 2)
+    sprite.fill(Qt.GlobalColor.transparent)
+
+    painter = QPainter(sprite)
+    painter.setPen(QPen(QColor("#000000"), 1))
+    painter.setBrush(QBrush(QColor(color)))
+    painter.drawEllipse(QRectF(1, 1, diameter, diameter))
+    painter.end()
+
+    return sprite
+
+
+class SourceListModel(QAbstractListModel):
+    """List model exposing source names, trace flags and types to the source menu."""
+
+    TraceRole = Qt.ItemDataRole.UserRole
+    TypeRole = Qt.ItemDataRole.UserRole + 1
+
+    def __init__(self, sources):
+        super().__init__()
+        self.sources = sources
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.sources)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+
+        source = self.sources[index.row()]
+        if role == Qt.ItemDataRole.DisplayRole:
+            return source[0]
+        elif role == self.TraceRole:
+            return source[4]
+        elif role == self.TypeRole:
+            return source[3]
+        return None
+
+    def setData(self, index, value, role=Qt.ItemDataRole.EditRole):
+        if not index.isValid() or role not in (self.TraceRole, self.TypeRole):
+            return False
+
+        column = 4 if role == self.TraceRole else 3
+        if self.sources[index.row()][column] != value:
+            self.sources[index.row()][column] = value
+            self.dataChanged.emit(index, index, [role])
+        return True
+
+    def set_trace(self, source_id, state):
+        """Sets the trace flag of a source."""
+
+        self.setData(self.index(source_id), int(state), self.TraceRole)
+
+    def toggle_trace(self, source_id):
+        """Flips the trace flag of a source."""
+
+        self.set_trace(source_id, not self.sources[source_id][4])
+
+    def set_type(self, source_id, value):
+        """Sets the type of a source."""
+
+        self.setData(self.index(source_id), value, self.TypeRole)
+
+    def add_sources(self, sources):
+        """Appends sources to the source list."""
+
+        self.beginInsertRows(QModelIndex(), len(self.sources), len(self.sources) + len(sources) - 1)
+        self.sources.extend(sources)
+        self.endInsertRows()
+
+
+class CatalogImporter(QThread):
+    """Background thread streaming sources from a catalog file in batches."""
+
+    batch_ready = pyqtSignal(list, float)
+    failed = pyqtSignal(str)
+
+    def __init__(self, file, max_magnitude, latitude, min_elevation=0):
+        super().__init__()
+        self.file = file
+        self.max_magnitude = max_magnitude
+        self.latitude = latitude
+        self.min_elevation = min_elevation
+
+    def run(self):
+        try:
+            for batch, progress in import_batches(self.file, self.max_magnitude, self.latitude, self.min_elevation,
+                                                  should_stop=self.isInterruptionRequested):
+                if self.isInterruptionRequested():
+                    return
+                self.batch_ready.emit(batch, progress)
+        except (OSError, ValueError, EOFError) as error:
+            self.failed.emit(str(error))
@@ -0,0 +1,101 @@
+import csv
+import gzip
+import io
+import os
+import time
+
+from precession import J2000_YEAR, apply_proper_motion
+
+IMPORT_BATCH_SIZE = 2000  # Number of sources passed on at a time
+IMPORT_CHECK_ROWS = 1000    # Number of catalog rows read between checks for cancellation and progress updates
+IMPORT_PROGRESS_INTERVAL = 0.1  # Longest time in seconds between progress updates, sent without sources if needed
+
+# Column names of supported catalog formats, the factor converting their right ascension to hours and the Julian
+# epoch of their positions, with proper motions in mas/yr
+CATALOG_FORMATS = {
+    "hyg": {"name": ("proper", "bf", "hip", "id"), "ra": "ra", "dec": "dec", "magnitude": "mag", "ra_scale": 1,
+            "pm_ra": "pmra", "pm_dec": "pmdec", "epoch": 2000.0},
+    "gaia": {"name": ("designation", "source_id"), "ra": "ra", "dec": "dec", "magnitude": "phot_g_mean_mag",
+             "ra_scale": 1 / 15, "pm_ra": "pmra", "pm_dec": "pmdec", "epoch": 2016.0},
+}
+
+
+def detect_format(header):
+    """Returns the catalog format matching given header columns."""
+
+    for catalog_format, columns in CATALOG_FORMATS.items():
+        if columns["magnitude"] in header and columns["ra"] in header and columns["dec"] in header:
+            return catalog_format
+
+    raise ValueError("Unknown catalog format!")
+
+
+def read_catalog(file):
+    """Yields (name, right ascension, declination, magnitude, PM RA, PM Dec, progress) for each row of a catalog file.
+
+    Right ascension is given in hours and declination in degrees at J2000, moving positions of other epochs back
+    along their proper motions, which are in mas/yr and 0 when missing. Progress is the fraction of the file read
+    so far, measured on the compressed data for gzip files. Rows with missing coordinates or magnitude are skipped.
+    """
+
+    with open(file, 'rb') as raw_file:
+        file_size = max(1, os.fstat(raw_file.fileno()).st_size)
+        binary_file = gzip.GzipFile(fileobj=raw_file) if file.endswith(".gz") else raw_file
+        text_file = io.TextIOWrapper(binary_file, encoding="utf-8", newline='')
+
+        csv_reader = csv.DictReader(text_file)
+        columns = CATALOG_FORMATS[detect_format(csv_reader.fieldnames or [])]
+        for row in csv_reader:
+            try:
+                right_ascension = float(row[columns["ra"]]) * columns["ra_scale"]
+                declination = float(row[columns["dec"]])
+                magnitude = float(row[columns["magnitude"]])
+            except (TypeError, ValueError):
+                continue
+
+            try:
+                pm_right_ascension = float(row.get(columns["pm_ra"]) or 0)
+                pm_declination = float(row.get(columns["pm_dec"]) or 0)
+            except ValueError:
+                pm_right_ascension = pm_declination = 0.0
+            if columns["epoch"] != J2000_YEAR and (pm_right_ascension or pm_declination):
+                right_ascension, declination = map(float, apply_proper_motion(
+                    right_ascension, declination, pm_right_ascension, pm_declination, J2000_YEAR - columns["epoch"]))
+
+            name = next((row[column] for column in columns["name"] if row.get(column)), "")
+            yield (name, right_ascension, declination, magnitude, pm_right_ascension, pm_declination,
+                   raw_file.tell() / file_size)
+
+
+def import_batches(file, max_magnitude, latitude, min_elevation=0, source_type=0, batch_size=IMPORT_BATCH_SIZE,
+                   should_stop=None):
+    """Yields (sources, progress) batches of catalog sources that are bright enough and rise high enough.
+
+    Sources are in the format of load_sources, with tracing disabled and with epoch and proper motion entries.
+    Batches are also yielded at least every IMPORT_PROGRESS_INTERVAL seconds, empty if no sources were accepted
+    meanwhile, and reading stops early once given should_stop function returns True.
+    """
+
+    batch = []
+    last_yield = time.perf_counter()
+    for row_count, (name, right_ascension, declination, magnitude, pm_right_ascension, pm_declination, progress) in \
+            enumerate(read_catalog(file), start=1):
+        if row_count % IMPORT_CHECK_ROWS == 0:
+            if should_stop is not None and should_stop():
+                return
+            if time.perf_counter() - last_yield >= IMPORT_PROGRESS_INTERVAL:
+                yield [], progress  # Progress update while few rows are accepted, e.g. with a strict magnitude limit
+                last_yield = time.perf_counter()
+
+        # Skip sources that are too faint or never culminate above the elevation limit
+        if magnitude > max_magnitude or 90 - abs(latitude - declination) < min_elevation:
+            continue
+
+        batch.append([name, right_ascension % 24, declination, source_type, 0, J2000_YEAR, pm_right_ascension,
+                      pm_declination])
+        if len(batch) >= batch_size:
+            yield batch, progress
+            batch = []
+            last_yield = time.perf_counter()
+
+    yield batch, 1.0
@@ -0,0 +1,110 @@
+import functools
+import json
+import os
+import threading
+import time
+
+RING_CAPACITY = 4096    # Number of most recent calls kept per instrumented name
+
+
+class RingBuffer:
+    """Fixed-size record of the most recent call start times, durations and threads in nanoseconds."""
+
+    def __init__(self, capacity=RING_CAPACITY):
+        self.capacity = capacity
+        self.starts = [0] * capacity
+        self.durations = [0] * capacity
+        self.threads = [0] * capacity
+        self.count = 0
+
+    def add(self, start, duration, thread):
+        index = self.count % self.capacity
+        self.starts[index] = start
+        self.durations[index] = duration
+        self.threads[index] = thread
+        self.count += 1
+
+    def records(self):
+        """Returns stored (start, duration, thread) records from oldest to newest."""
+
+        first = max(0, self.count - self.capacity)
+        return [(self.starts[i % self.capacity], self.durations[i % self.capacity], self.threads[i % self.capacity])
+                for i in range(first, self.count)]
+
+    def last(self):
+        """Returns duration of the most recent call, or 0 if there is none."""
+
+        return self.durations[(self.count - 1) % self.capacity] if self.count else 0
+
+    def mean(self, count=60):
+        """Returns mean duration of up to given number of most recent calls."""
+
+        count = min(count, self.count, self.capacity)
+        if count == 0:
+            return 0
+        return sum(self.durations[(self.count - 1 - i) % self.capacity] for i in range(count)) / count
+
+
+class Profiler:
+    """Collects durations of instrumented calls into per-name ring buffers."""
+
+    def __init__(self):
+        self.buffers = {}
+        self.origin = time.perf_counter_ns()
+
+    def buffer(self, name):
+        """Returns the ring buffer of given name, creating it if needed."""
+
+        if name not in self.buffers:
+            self.buffers[name] = RingBuffer()
+        return self.buffers[name]
+
+    def record(self, name, start, duration):
+        """Stores one call of given start time and duration from perf_counter_ns."""
+
+        self.buffer(name).add(start - self.origin, duration, threading.get_ident())
+
+    def timed(self, name):
+        """Returns a decorator recording durations of each call of the decorated function."""
+
+        buffer = self.buffer(name)
+
+        def decorator(function):
+            @functools.wraps(function)
+            def wrapper(*args, **kwargs):
+                start = time.perf_counter_ns()
+                try:
+                    return function(*args, **kwargs)
+                finally:
+                    end = time.perf_counter_ns()
+                    buffer.add(start - self.origin, end - start, threading.get_ident())
+
+            return wrapper
+
+        return decorator
+
+    def last_ms(self, name):
+        """Returns duration of the most recent call of given name in milliseconds."""
+
+        return self.buffer(name).last() / 1e6
+
+    def mean_ms(self, name, count=60):
+        """Returns mean duration of recent calls of given name in milliseconds."""
+
+        return self.buffer(name).mean(count) / 1e6
+
+    def write_chrome_trace(self, file):
+        """Writes recorded calls as a Chrome trace-event JSON file, viewable in chrome://tracing or Perfetto."""
+
+        events = []
+        for name, buffer in self.buffers.items():
+            for start, duration, thread in buffer.records():
+                events.append({"name": name, "ph": "X", "ts": start / 1000, "dur": duration / 1000,
+                               "pid": os.getpid(), "tid": thread})
+
+        events.sort(key=lambda event: event["ts"])
+        with open(file, 'w', encoding="utf-8") as trace_file:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, trace_file)
+
+
+profiler = Profiler()   # Shared profiler of the application's hot paths
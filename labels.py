@@ -0,0 +1,157 @@
+import heapq
+import math
+
+import numpy as np
+
+LABEL_CELL_SIZE = 32    # Side of the spatial hash cells in pixels
+LABEL_OFFSET = 15   # Distance of label centers below their markers in pixels
+LABEL_MOVE_THRESHOLD = 1    # Smallest label movement in pixels that causes it to be placed again
+
+
+class LabelGrid:
+    """Picks non-overlapping source labels by priority, using a spatial hash of label boxes.
+
+    The grid is kept between updates, so only labels that moved, appeared or had space freed next to them are
+    placed again.
+    """
+
+    def __init__(self, label_width, label_height, cell_size=LABEL_CELL_SIZE):
+        self.label_width = label_width  # Function returning the label width of a source index
+        self.label_height = label_height
+        self.cell_size = cell_size
+
+        self.widths = np.zeros(0)
+        self.x = np.zeros(0)    # Label centers as last placed
+        self.y = np.zeros(0)
+        self.priority = np.zeros(0)
+        self.active = np.zeros(0, dtype=bool)   # Label is in the grid, either placed or waiting for space
+        self.placed = np.zeros(0, dtype=bool)
+
+        self.label_cells = {}   # Cells covered by each active label
+        self.boxes = {}     # Center, width and priority of each active label
+        self.placed_cells = {}  # Placed labels in each cell
+        self.waiting_cells = {}     # Labels blocked by a placed label in each cell
+
+    def update(self, x, y, candidates, priority):
+        """Places labels of candidate sources at given marker positions and returns which labels are shown.
+
+        Labels of higher priority are placed first, and labels overlapping an already placed one are hidden.
+        """
+
+        self.extend(len(x))
+
+        # Only candidates and labels in the grid can change, usually few of all sources
+        indices = np.union1d(np.flatnonzero(candidates), np.flatnonzero(self.active))
+        label_y = y[indices] + LABEL_OFFSET
+        changed = ((np.abs(x[indices] - self.x[indices]) >= LABEL_MOVE_THRESHOLD)
+                   | (np.abs(label_y - self.y[indices]) >= LABEL_MOVE_THRESHOLD)
+                   | (priority[indices] != self.priority[indices]))
+        shown = candidates[indices]
+        active = self.active[indices]
+
+        # Take out labels that moved or are no longer shown, and retry labels waiting for the freed space
+        queue = set()
+        for i in indices[active & (changed | ~shown)].tolist():
+            queue.update(self.remove(i))
+
+        added_mask = shown & (changed | ~active)
+        added = indices[added_mask]
+        unknown = added[np.isnan(self.widths[added])]
+        self.widths[unknown] = [self.label_width(i) for i in unknown.tolist()]
+        self.x[added] = x[added]
+        self.y[added] = label_y[added_mask]
+        self.priority[indices] = priority[indices]
+
+        queue = {i for i in queue if candidates[i]}
+        queue.update(added.tolist())
+        self.place(queue)
+
+        return self.placed
+
+    def extend(self, count):
+        """Adds empty label state for sources appended since the last update."""
+
+        added = count - len(self.x)
+        if added <= 0:
+            return
+
+        self.widths = np.concatenate((self.widths, np.full(added, np.nan)))
+        self.x = np.concatenate((self.x, np.full(added, np.nan)))
+        self.y = np.concatenate((self.y, np.full(added, np.nan)))
+        self.priority = np.concatenate((self.priority, np.zeros(added)))
+        self.active = np.concatenate((self.active, np.zeros(added, dtype=bool)))
+        self.placed = np.concatenate((self.placed, np.zeros(added, dtype=bool)))
+
+    def place(self, queue):
+        """Places queued labels from highest to lowest priority, moving lower priority overlaps aside."""
+
+        heap = [(-float(self.priority[i]), i) for i in queue]
+        heapq.heapify(heap)
+        queued = set(queue)
+
+        while heap:
+            _, i = heapq.heappop(heap)
+            queued.discard(i)
+            if self.active[i]:
+                self.remove(i)
+
+            # Find placed labels overlapping this one, stopping at the first that takes precedence
+            x, y, width, priority = (float(self.x[i]), float(self.y[i]), float(self.widths[i]),
+                                     float(self.priority[i]))
+            cells = self.box_cells(x, y, width)
+            blockers = set()
+            blocked = False
+            for j in (j for cell in cells for j in self.placed_cells.get(cell, ())):
+                other_x, other_y, other_width, other_priority = self.boxes[j]
+                if abs(x - other_x) * 2 < width + other_width and abs(y - other_y) < self.label_height:
+                    if other_priority >= priority:
+                        blocked = True
+                        break
+                    blockers.add(j)
+
+            self.label_cells[i] = cells
+            self.boxes[i] = (x, y, width, priority)
+            self.active[i] = True
+            if blocked:
+                for cell in cells:
+                    self.waiting_cells.setdefault(cell, set()).add(i)
+                continue
+
+            # Lower priority labels in the way give up their place and are queued again with their neighbors
+            for j in blockers:
+                for k in self.remove(j) | {j}:
+                    if k not in queued:
+                        queued.add(k)
+                        heapq.heappush(heap, (-float(self.priority[k]), k))
+
+            for cell in cells:
+                self.placed_cells.setdefault(cell, set()).add(i)
+            self.placed[i] = True
+
+    def remove(self, i):
+        """Takes a label out of the grid and returns the waiting labels that may fit in its place."""
+
+        freed = set()
+        cells = self.label_cells.pop(i, ())
+        self.boxes.pop(i, None)
+        if self.placed[i]:
+            for cell in cells:
+                self.placed_cells[cell].discard(i)
+                freed.update(self.waiting_cells.get(cell, ()))
+        else:
+            for cell in cells:
+                self.waiting_cells[cell].discard(i)
+
+        self.active[i] = False
+        self.placed[i] = False
+        return freed
+
+    def box_cells(self, x, y, width):
+        """Returns keys of the grid cells covered by a label centered at given position."""
+
+        half_height = self.label_height / 2
+        x_cells = range(math.floor((x - width / 2) / self.cell_size), math.floor((x + width / 2) / self.cell_size) + 1)
+        y_cells = range(math.floor((y - half_height) / self.cell_size),
+                        math.floor((y + half_height) / self.cell_size) + 1)
+
+        return [(x_cell, y_cell) for x_cell in x_cells for y_cell in y_cells]
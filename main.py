@@ -1,29 +1,44 @@
-import calendar
-import csv
+import argparse
 import math
-import sys
 import os
-import shutil
+import sys
 import time
 
-from PyQt6.QtCore import Qt
-from PyQt6.QtGui import QBrush, QColor
-from PyQt6.QtWidgets import (QGraphicsScene, QGraphicsView, QApplication, QCheckBox, QGraphicsProxyWidget)
-
-from gui_elements import LineBetween, CenteredCircle, Text, IntegerSelector, TextInput
-
-SOURCE_FILE = "sources.csv"
-CONFIG_FILE = "config.csv"
-
-VERNAL_EQUINOX_UTC = "2025-03-20 09:01"     # UTC time of a vernal equinox
-LST_FIX = -7.3 / 60  # Equation of time and unknown offset in hours
+import numpy as np
+
+from PyQt6.QtCore import Qt, QTimer
+from PyQt6.QtGui import QBrush, QColor, QFont, QFontMetricsF, QTransform
+from PyQt6.QtWidgets import (QGraphicsScene, QGraphicsView, QApplication, QCheckBox, QGraphicsProxyWidget, QToolTip,
+                             QFileDialog, QInputDialog, QGraphicsItem, QLineEdit)
+
+from catalog import load_config, load_sites, load_sources, save_sources
+from gui_elements import (LineBetween, CenteredCircle, Text, IntegerSelector, TextInput, SearchInput,
+                          SourceListModel, MarkerLayer, CatalogImporter, ItemContainer, CurvedPath)
+from instrumentation import profiler
+from labels import LabelGrid
+from positions import BODY_PATH_STEP, PositionEngine, local_to_lst, night_window
+from scheduler import load_plan
+from search import NameIndex
+from sites import SitePool
+from visibility import RiseSetSolver
+
+MENU_ROWS = 18  # Number of source menu rows shown at once
+BATCHED_MARKER_THRESHOLD = 2000  # Source count above which all markers are painted by a single item
+PLAYBACK_INTERVAL = 16  # Playback frame interval in milliseconds
+PLAYBACK_SPEEDS = (1, 10, 60, 300, 600, 1800, 3600, 10000)  # Selectable playback speeds relative to real time
+OVERLAY_INTERVAL = 250  # Performance overlay refresh interval in milliseconds
+IMPORT_APPLY_INTERVAL = 250  # Shortest time in milliseconds between adding queued imported sources to the view
+IMPORT_APPLY_SHARE = 0.25   # Largest share of time spent adding imported sources, leaving the rest for drawing
+HIGHLIGHT_DIAMETER = 24     # Diameter of the ring around the marker of the selected source
 
 
 class GUIView(QGraphicsView):
     """GUI window handler."""
 
-    def __init__(self, local_time):
+    def __init__(self, local_time, trace_file=None):
         super().__init__()
+        self.trace_file = trace_file
+        self.last_paint_start = None
 
         config = load_config()
         coordinates = (config[0], config[1])
@@ -32,55 +47,85 @@ class GUIView(QGraphicsView):
         self.degree_scaling = config[6]
 
         # Instantiate GUI window
-        self.scene = GUIScene(window_size, self.degree_scaling, elevation_range, local_time, coordinates)
+        self.scene = GUIScene(window_size, self.degree_scaling, elevation_range, local_time, coordinates,
+                              sites=load_sites())
         self.scene.setSceneRect(-window_size[0] / 2 * 0.99, -window_size[1] / 2 * 0.99,
                                 window_size[0] * 0.99, window_size[1] * 0.99)
         self.setScene(self.scene)
         self.resize(window_size[0], window_size[1])
         self.setWindowTitle("Observation")
 
+    def paintEvent(self, event):
+        """Paints the view, recording paint durations and intervals between frames."""
+
+        start = time.perf_counter_ns()
+        if self.last_paint_start is not None:
+            profiler.record("frame", self.last_paint_start, start - self.last_paint_start)
+        self.last_paint_start = start
+
+        super().paintEvent(event)
+        profiler.record("paint", start, time.perf_counter_ns() - start)
+
     def closeEvent(self, event):
         """Saves source list on exit."""
 
+        if self.scene.importer is not None:
+            self.scene.cancel_import()
+            self.scene.importer.wait()
+        self.scene.close_site_pool()
+
         if save_sources(self.scene.types, self.scene.sources):
             event.ignore()
+            return
+
+        if self.trace_file is not None:
+            profiler.write_chrome_trace(self.trace_file)
+            print("Trace written to", self.trace_file)
 
 
 class GUIScene(QGraphicsScene):
     """Scene used to hold all GUI elements."""
 
-    def __init__(self, window_size, deg_scale, el_range, loc_time, coords):
+    def __init__(self, window_size, deg_scale, el_range, loc_time, coords, batched=None, sites=None):
         super(GUIScene, self).__init__()
         self.window_size = window_size
         self.degree_scaling = deg_scale
         self.elevation_range = el_range
         self.local_time = loc_time
         self.coordinates = coords
+
+        # Observation sites as (name, latitude, longitude, min elevation, max elevation), the first one shown
+        self.sites = sites or [("", coords[0], coords[1], el_range[0], el_range[1])]
+        self.site_index = 0
         
         self.types, self.sources = load_sources()
+        if batched is None:
+            batched = len(self.sources) > BATCHED_MARKER_THRESHOLD
+
+        # Sky chart items, hidden together while all sites are tiled
+        self.chart = ItemContainer()
+        self.addItem(self.chart)
 
         # Add elevation circles
         for i in range(6):
-            self.addItem(CenteredCircle(0, 0, (90 - 15 * i) * self.degree_scaling * 2,
-                                        outline_width=1, outline_color="#A0A0A0", layer=-1))
-            self.addItem(Text(0, -15 * (i + 1) * self.degree_scaling + 8, f"{90 - 15 * (i + 1)}°",
-                              font_size=6, color="#A0A0A0", alignment=-1, layer=-1))
+            self.add_chart_item(CenteredCircle(0, 0, (90 - 15 * i) * self.degree_scaling * 2,
+                                               outline_width=1, outline_color="#A0A0A0", layer=-1))
+            self.add_chart_item(Text(0, -15 * (i + 1) * self.degree_scaling + 8, f"{90 - 15 * (i + 1)}°",
+                                     font_size=6, color="#A0A0A0", alignment=-1, layer=-1))
 
         # Add azimuth lines
         for i in range(12):
             x_end = math.cos(i * (2 * math.pi / 12)) * 90 * self.degree_scaling
             y_end = math.sin(i * (2 * math.pi / 12)) * 90 * self.degree_scaling
-            self.addItem(LineBetween(0, 0, x_end, y_end, color="#A0A0A0", layer=-1))
+            self.add_chart_item(LineBetween(0, 0, x_end, y_end, color="#A0A0A0", layer=-1))
 
-        self.addItem(Text(0, -90 * self.degree_scaling - 10, "N", font_size=8, color="#A0A0A0", layer=-1))
-        self.addItem(Text(0, 90 * self.degree_scaling + 10, "S", font_size=8, color="#A0A0A0", layer=-1))
-        self.addItem(Text(-90 * self.degree_scaling - 10, 0, "E", font_size=8, color="#A0A0A0", layer=-1))
-        self.addItem(Text(90 * self.degree_scaling + 10, 0, "W", font_size=8, color="#A0A0A0", layer=-1))
+        self.add_chart_item(Text(0, -90 * self.degree_scaling - 10, "N", font_size=8, color="#A0A0A0", layer=-1))
+        self.add_chart_item(Text(0, 90 * self.degree_scaling + 10, "S", font_size=8, color="#A0A0A0", layer=-1))
+        self.add_chart_item(Text(-90 * self.degree_scaling - 10, 0, "E", font_size=8, color="#A0A0A0", layer=-1))
+        self.add_chart_item(Text(90 * self.degree_scaling + 10, 0, "W", font_size=8, color="#A0A0A0", layer=-1))
 
-        self.addItem(CenteredCircle(0, 0, (90 - self.elevation_range[0]) * self.degree_scaling * 2,
-                                    outline_width=3, outline_color="#FF0000"))
-        self.addItem(CenteredCircle(0, 0, (90 - self.elevation_range[1]) * self.degree_scaling * 2,
-                                    outline_width=2, dashed=True, outline_color="#FF0000"))
+        self.limit_circles = []
+        self.update_limit_circles()
 
         # Add time menu
         time_start_position = (-self.window_size[0] / 2 + 80, -self.window_size[1] / 2 + 50)
@@ -112,22 +157,58 @@ class GUIScene(QGraphicsScene):
         self.addItem(self.utc_text)
         self.addItem(self.lst_text)
 
+        # Add playback controls
+        self.playback_timer = QTimer()
+        self.playback_timer.setTimerType(Qt.TimerType.PreciseTimer)
+        self.playback_timer.setInterval(PLAYBACK_INTERVAL)
+        self.playback_timer.timeout.connect(self.on_playback_frame)
+        self.playback_speed = PLAYBACK_SPEEDS.index(60)
+        self.playback_direction = 1
+        self.playback_clock = 0
+        self.playback_text = Text(time_start_position[0] + 15, time_start_position[1] + 90, "",
+                                  alignment=-1, font_size=8, color="#A0A0A0")
+        self.addItem(self.playback_text)
+        self.update_playback_text()
+
+        # Add site name, and small sky views of all sites shown side by side on request
+        self.site_text = Text(0, -self.window_size[1] / 2 + 20, "", font_size=12, color="#F0F0F0")
+        self.addItem(self.site_text)
+        self.update_site_text()
+        self.tiles = []
+        self.tile_path_window = None    # Night that paths of moving sources in the tiles were drawn for
+        self.site_pool = None
+        self.site_events_time = None
+        self.all_site_events = []
+
         # Create source menu header
         menu_start_position = (self.window_size[0] / 2 - 120, -self.window_size[1] / 2 + 50)
         self.addItem(Text(menu_start_position[0], menu_start_position[1], "Source | Trace | Type",
                           font_size=12, color="#F0F0F0"))
 
-        # Add source menu items
+        # Add source search, listing only sources whose name contains the typed text
+        self.name_index = NameIndex(lambda i: self.sources[i][0], len(self.sources))
+        self.menu_rows = None   # Source indices listed while searching, None when listing all sources
+        self.menu_complete = True   # Whether the listed search results are all matches
+        self.selected_source = None
+        proxy = QGraphicsProxyWidget()
+        search_input_size = (280, 26)
+        self.search_input = SearchInput(search_input_size[0], search_input_size[1], font_size=10, parent_scene=self)
+        proxy.setWidget(self.search_input)
+        proxy.setPos(menu_start_position[0] - 160, menu_start_position[1] - 45)
+        self.addItem(proxy)
+
+        # Add source menu rows, reused for whichever sources are scrolled into view
+        self.source_model = SourceListModel(self.sources)
+        self.source_model.dataChanged.connect(self.on_source_change)
+        self.menu_offset = 0
         self.menu_items = []
-        # TODO: Add scrolling to support more than 18 sources
-        for i in range(min(len(self.sources), 18)):
-            name = Text(menu_start_position[0] - 20, menu_start_position[1] + 35 + i * 35, self.sources[i][0],
+        for i in range(MENU_ROWS):
+            name = Text(menu_start_position[0] - 20, menu_start_position[1] + 35 + i * 35, "",
                         alignment=1, font_size=12, color="#F0F0F0")
             self.addItem(name)
 
             proxy = QGraphicsProxyWidget()
             checkbox = QCheckBox()
-            checkbox.setChecked(self.sources[i][4])
             checkbox.stateChanged.connect(lambda state, index=i: self.on_selection_change(state, index))
             proxy.setWidget(checkbox)
             proxy.setPos(menu_start_position[0], menu_start_position[1] + 28 + i * 35)
@@ -135,49 +216,481 @@ class GUIScene(QGraphicsScene):
 
             proxy = QGraphicsProxyWidget()
             int_selector = IntegerSelector(max_val=len(self.types) - 1)
-            int_selector.setValue(self.sources[i][3])
             int_selector.valueChanged.connect(lambda value, index=i: self.on_value_change(value, index))
             proxy.setWidget(int_selector)
             proxy.setPos(menu_start_position[0] + 40, menu_start_position[1] + 24 + i * 35)
             self.addItem(proxy)
 
-            self.menu_items.append((i, name, checkbox, int_selector))
+            self.menu_items.append([i, name, checkbox, int_selector])
+
+        self.menu_position_text = Text(menu_start_position[0], menu_start_position[1] + 35 + MENU_ROWS * 35, "",
+                                       font_size=8, color="#A0A0A0")
+        self.addItem(self.menu_position_text)
+        self.menu_left = menu_start_position[0] - 160
+        self.refresh_menu()
 
         # Add objects from source list
+        self.engine = PositionEngine(self.sources, self.coordinates, self.degree_scaling)
+        self.rise_set = RiseSetSolver(self.engine)
         self.source_items = []
-        for source in self.sources:
-            # Draw object path
-            path = CenteredCircle(0, -(90 - self.coordinates[0]) * self.degree_scaling,
-                                  (90 - source[2]) * self.degree_scaling * 2,
-                                  outline_width=1, dashed=True, outline_color="#00A000", layer=1)
-            self.addItem(path)
-
-            culmination_ratio = (source[1] - (local_to_lst(self.local_time, self.coordinates).tm_hour
-                                              + local_to_lst(self.local_time, self.coordinates).tm_min / 60
-                                              + local_to_lst(self.local_time, self.coordinates).tm_sec / 3600)) / 24
-
-            x_offset = -math.sin(culmination_ratio * 2 * math.pi) * (90 - source[2]) * self.degree_scaling
-            y_offset = math.cos(culmination_ratio * 2 * math.pi) * (90 - source[2]) * self.degree_scaling
+        self.marker_layer = None
+        self.source_day = None  # Day of the source places that paths and the rising mask were drawn for
+        self.body_path_key = None   # Night and site that paths of moving sources were drawn for
+        self.marker_x, self.marker_y, self.shown = self.sky_positions()
+
+        self.drawn_x = np.zeros(0)    # Positions items were last moved to
+        self.drawn_y = np.zeros(0)
+        self.drawn_shown = np.zeros(0, dtype=bool)
+        self.drawn_labels = np.zeros(0, dtype=bool)
+        if batched:
+            self.use_marker_layer()
+        else:
+            self.add_source_items(0)
+
+        # Place labels of traced sources without overlaps, larger markers first
+        label_font = QFont()
+        label_font.setPointSize(8)
+        label_metrics = QFontMetricsF(label_font)
+        self.label_grid = LabelGrid(lambda i: label_metrics.horizontalAdvance(self.sources[i][0]) + 4,
+                                    label_metrics.height() + 2)
+        self.traced = np.zeros(0, dtype=bool)
+        self.label_priority = np.zeros(0)
+        self.update_label_options(0, len(self.sources) - 1)
+        self.update_labels()
+        self.update_body_paths()
+
+        # Ring around the marker of the source selected in the menu
+        self.highlight = CenteredCircle(0, 0, HIGHLIGHT_DIAMETER, outline_width=2, outline_color="#FF8000", layer=4)
+        self.highlight.setVisible(False)
+        self.add_chart_item(self.highlight)
+
+        # Add observing plan overlay
+        self.plan = load_plan()
+        self.plan_nights = {}
+        for night, _, _, start, end in self.plan:
+            night_start, night_end = self.plan_nights.get(night, (start, end))
+            self.plan_nights[night] = (min(night_start, start), max(night_end, end))
+        self.source_indices = {source[0]: i for i, source in enumerate(self.sources)}
+        self.plan_items = []
+        self.plan_night = None
+        self.update_plan_overlay()
+
+        # Add catalog import status
+        self.importer = None
+        self.import_pending = []    # Imported sources waiting to be added together by the import timer
+        self.import_timer = QTimer()
+        self.import_timer.setSingleShot(True)
+        self.import_timer.timeout.connect(self.apply_import)
+        self.import_text = Text(time_start_position[0] - 60, self.window_size[1] / 2 - 30, "",
+                                alignment=-1, font_size=8, color="#A0A0A0")
+        self.addItem(self.import_text)
+
+        # Add performance overlay
+        self.overlay_text = Text(self.window_size[0] / 2 - 20, self.window_size[1] / 2 - 60, "",
+                                 alignment=1, font_size=8, color="#A0A0A0", layer=4)
+        self.overlay_text.setVisible(False)
+        self.addItem(self.overlay_text)
+        self.overlay_timer = QTimer()
+        self.overlay_timer.setInterval(OVERLAY_INTERVAL)
+        self.overlay_timer.timeout.connect(self.update_overlay)
+
+    def add_chart_item(self, item):
+        """Adds an item to the sky chart of the selected site."""
+
+        item.setParentItem(self.chart)
+
+    def update_limit_circles(self):
+        """Draws the elevation limits of the selected site."""
+
+        for item in self.limit_circles:
+            self.removeItem(item)
+
+        self.limit_circles = [
+            CenteredCircle(0, 0, (90 - self.elevation_range[0]) * self.degree_scaling * 2,
+                           outline_width=3, outline_color="#FF0000"),
+            CenteredCircle(0, 0, (90 - self.elevation_range[1]) * self.degree_scaling * 2,
+                           outline_width=2, dashed=True, outline_color="#FF0000"),
+        ]
+        for item in self.limit_circles:
+            self.add_chart_item(item)
+
+    def update_site_text(self):
+        """Shows the name of the selected site when there are several."""
+
+        if len(self.sites) > 1:
+            self.site_text.set_text(f"{self.sites[self.site_index][0]}  (O: next site, T: tile sites)")
+
+    def set_site(self, index):
+        """Switches the sky chart, times and visibility to the site of given index."""
+
+        old_pole_offset = self.engine.pole_offset()
+        self.site_index = index
+        _, latitude, longitude, min_elevation, max_elevation = self.sites[index]
+        self.coordinates = (latitude, longitude)
+        self.elevation_range = (min_elevation, max_elevation)
+        self.engine.coordinates = self.coordinates
+        self.rising = self.engine.reaches_elevation(min_elevation)
+        self.update_limit_circles()
+
+        # Source paths circle the celestial pole, which moves with latitude
+        pole_offset = self.engine.pole_offset()
+        for path, _, _ in self.source_items:
+            path.moveBy(0, pole_offset - old_pole_offset)
+        if self.marker_layer is not None:
+            self.marker_layer.path_center = (0, pole_offset)
+            self.marker_layer.update_bounds()
+
+        self.update_site_text()
+        self.update_time()
+
+    def toggle_tiles(self):
+        """Switches between the sky chart of the selected site and smaller charts of all sites side by side."""
+
+        if self.tiles:
+            for _, _, _, layer in self.tiles:
+                self.removeItem(layer)
+            self.tiles = []
+        else:
+            self.add_tiles()
+
+        self.chart.setVisible(not self.tiles)
+        self.update_time()
+
+    def add_tiles(self):
+        """Creates a small sky chart for each site, arranged in a grid left of the source menu."""
+
+        left, right = -self.window_size[0] / 2 + 20, self.menu_left - 20
+        top, bottom = -self.window_size[1] / 2 + 150, self.window_size[1] / 2 - 40
+        columns = max(range(1, len(self.sites) + 1),
+                      key=lambda n: min((right - left) / n, (bottom - top) / math.ceil(len(self.sites) / n)))
+        rows = math.ceil(len(self.sites) / columns)
+        tile_scale = (min((right - left) / columns, (bottom - top) / rows)
+                      / ((90 * self.degree_scaling + 30) * 2))
+
+        for i, (name, latitude, longitude, min_elevation, _) in enumerate(self.sites):
+            # Position engines of all tiles use the source arrays of the main one
+            engine = PositionEngine([], (latitude, longitude), self.degree_scaling)
+            engine.share_sources(self.engine)
+            layer = MarkerLayer(self.types, self.sources, (0, engine.pole_offset()), engine.path_diameters(),
+                                parent_scene=self, clip_radius=90 * self.degree_scaling)
+            layer.setPos(left + (i % columns + 0.5) * (right - left) / columns,
+                         top + (i // columns + 0.5) * (bottom - top) / rows)
+            layer.setScale(tile_scale)
+            self.addItem(layer)
+
+            # Draw horizon, elevation limit and site name behind the markers
+            horizon = CenteredCircle(0, 0, 180 * self.degree_scaling, outline_width=1, outline_color="#A0A0A0")
+            limit = CenteredCircle(0, 0, (90 - min_elevation) * self.degree_scaling * 2, outline_width=2,
+                                   outline_color="#FF0000")
+            for circle in (horizon, limit):
+                circle.setParentItem(layer)
+                circle.setFlag(QGraphicsItem.GraphicsItemFlag.ItemStacksBehindParent)
+            title = Text(0, -90 * self.degree_scaling - 15, name, font_size=max(8, round(10 / tile_scale)),
+                         color="#F0F0F0")
+            title.setParentItem(layer)
+
+            self.tiles.append((i, engine, engine.reaches_elevation(min_elevation), layer))
+        self.tile_path_window = None
+
+    def update_tiles(self):
+        """Moves markers of all site tiles to current time."""
+
+        window = night_window(self.local_time)
+        for tile, (i, engine, rising, layer) in enumerate(self.tiles):
+            day = engine.day
+            x, y, shown = engine.sky_positions(self.local_time, self.sites[i][3])
+            if engine.day != day:
+                rising = engine.reaches_elevation(self.sites[i][3])
+                self.tiles[tile] = (i, engine, rising, layer)
+                layer.path_diameters = engine.path_diameters()
+                layer.update_bounds()
+            if window != self.tile_path_window and len(engine.body_indices):
+                layer.set_body_paths(engine.body_indices, *engine.body_paths(*window, BODY_PATH_STEP))
+            layer.set_positions(x, y, shown & rising)
+        self.tile_path_window = window
+
+    def site_events(self, index):
+        """Returns rise, culmination and set times of all sources at the site of given index.
+
+        The times of all sites are computed at once in worker processes sharing the source arrays.
+        """
+
+        if self.site_events_time != self.local_time:
+            if self.site_pool is None:
+                self.site_pool = SitePool(self.engine, workers=min(len(self.sites), os.cpu_count() or 1))
+            self.all_site_events = self.site_pool.events(self.sites, self.local_time)
+            self.site_events_time = self.local_time
+
+        return self.all_site_events[index]
+
+    def close_site_pool(self):
+        """Stops the site worker processes, e.g. when their copy of the sources is outdated."""
+
+        if self.site_pool is not None:
+            self.site_pool.close()
+            self.site_pool = None
+        self.site_events_time = None
+
+    def sky_positions(self):
+        """Returns chart positions of all sources at current time and whether each is shown."""
+
+        # Source places move slightly from day to day with precession and proper motion
+        self.engine.set_date(self.local_time)
+        if self.engine.day != self.source_day:
+            self.update_source_paths()
+
+        x, y, shown = self.engine.sky_positions(self.local_time, self.elevation_range[0])
+        return x, y, shown & self.rising
+
+    def update_source_paths(self):
+        """Redraws source paths and the never rising sources for the current source places."""
+
+        self.source_day = self.engine.day
+        self.rising = self.engine.reaches_elevation(self.elevation_range[0])  # Sources never rising stay hidden
+        path_diameters = self.engine.path_diameters()
+
+        if self.marker_layer is not None:
+            self.marker_layer.path_diameters = path_diameters
+            self.marker_layer.update_bounds()
+            self.marker_layer.update()
+            return
+
+        # Only resize paths whose size changed visibly
+        for i, path_diameter in enumerate(path_diameters[:len(self.source_items)].tolist()):
+            path = self.source_items[i][0]
+            if isinstance(path, CurvedPath):
+                continue
+            path_rect = path.rect()
+            if abs(path_rect.width() - path_diameter) >= 0.5:
+                center_offset = (path_diameter - path_rect.width()) / 2
+                path.setRect(path_rect.x() - center_offset, path_rect.y() - center_offset, path_diameter,
+                             path_diameter)
+
+    def update_body_paths(self):
+        """Draws the paths of moving sources over the night of current time, when the night or site has changed."""
+
+        key = (night_window(self.local_time), self.coordinates, len(self.engine))
+        if key == self.body_path_key or len(self.engine.body_indices) == 0:
+            return
+        self.body_path_key = key
+
+        x, y = self.engine.body_paths(*key[0], BODY_PATH_STEP)
+        if self.marker_layer is not None:
+            self.marker_layer.set_body_paths(self.engine.body_indices, x, y)
+            return
+
+        for column, i in enumerate(self.engine.body_indices.tolist()):
+            self.source_items[i][0].set_points(x[:, column], y[:, column])
+
+    def add_source_items(self, first):
+        """Creates path, marker and label items for sources starting from given index."""
+
+        path_diameters = self.engine.path_diameters()[first:].tolist()
+        pole_offset = self.engine.pole_offset()
+        for i, (source, x, y) in enumerate(zip(self.sources[first:], self.marker_x[first:].tolist(),
+                                               self.marker_y[first:].tolist()), start=first):
+            # Draw object path, a curve over the night for moving sources
+            if isinstance(source[1], str):
+                path = CurvedPath(np.zeros(0), np.zeros(0), outline_width=1, dashed=True, outline_color="#00A000",
+                                  layer=1)
+            else:
+                path = CenteredCircle(0, pole_offset, path_diameters[i - first],
+                                      outline_width=1, dashed=True, outline_color="#00A000", layer=1)
+            self.add_chart_item(path)
 
             # Draw object
-            marker = CenteredCircle(x_offset, -(90 - self.coordinates[0]) * self.degree_scaling + y_offset,
-                                    self.types[source[3]][0], source_id=len(self.source_items), parent_scene=self,
+            marker = CenteredCircle(x, y, self.types[source[3]][0], source_id=i, parent_scene=self,
                                     fill_color=self.types[source[3]][1], outline_width=1, outline_color="#000000",
                                     layer=2)
-            self.addItem(marker)
+            self.add_chart_item(marker)
 
-            text = Text(x_offset, -(90 - self.coordinates[0]) * self.degree_scaling + y_offset + 15, f"{source[0]}",
-                        font_size=8, color="#0000F0", layer=3)
-            self.addItem(text)
+            text = Text(x, y + 15, f"{source[0]}", font_size=8, color="#0000F0", layer=3)
+            self.add_chart_item(text)
 
             path.setVisible(source[4])
-            text.setVisible(source[4])
+            marker.setVisible(bool(self.shown[i]))
+            text.setVisible(False)  # Shown once placed by the label grid
             self.source_items.append((path, marker, text))
 
+        self.drawn_x = np.concatenate((self.drawn_x[:first], self.marker_x[first:]))
+        self.drawn_y = np.concatenate((self.drawn_y[:first], self.marker_y[first:]))
+        self.drawn_shown = np.concatenate((self.drawn_shown[:first], self.shown[first:]))
+        self.drawn_labels = np.concatenate((self.drawn_labels[:first], np.zeros(len(self.sources) - first, dtype=bool)))
+
+    def update_source_items(self):
+        """Moves and shows or hides source items, touching only items whose state has changed."""
+
+        # Skip items of hidden sources and of sources that moved less than a pixel
+        moved = self.shown & ((np.abs(self.marker_x - self.drawn_x) >= 1) | (np.abs(self.marker_y - self.drawn_y) >= 1))
+        toggled = self.shown != self.drawn_shown
+
+        moved_indices = np.flatnonzero(moved)
+        x_moved = (self.marker_x[moved_indices] - self.drawn_x[moved_indices]).tolist()
+        y_moved = (self.marker_y[moved_indices] - self.drawn_y[moved_indices]).tolist()
+        for i, dx, dy in zip(moved_indices.tolist(), x_moved, y_moved):
+            _, marker, text = self.source_items[i]
+            marker.moveBy(dx, dy)
+            text.moveBy(dx, dy)
+        self.drawn_x[moved_indices] = self.marker_x[moved_indices]
+        self.drawn_y[moved_indices] = self.marker_y[moved_indices]
+
+        for i in np.flatnonzero(toggled).tolist():
+            self.source_items[i][1].setVisible(bool(self.shown[i]))
+        self.drawn_shown = self.shown.copy()
+
+    def update_label_options(self, first, last):
+        """Copies trace selections and label priorities of given source index range from the source list."""
+
+        self.label_grid.extend(len(self.sources))
+        self.traced = np.concatenate((self.traced, np.zeros(len(self.sources) - len(self.traced), dtype=bool)))
+        self.label_priority = np.concatenate((self.label_priority,
+                                              np.zeros(len(self.sources) - len(self.label_priority))))
+
+        # Larger marker types first, traced sources before others of the same type
+        self.traced[first:last + 1] = [source[4] for source in self.sources[first:last + 1]]
+        self.label_priority[first:last + 1] = [self.types[source[3]][0] * 2 + source[4]
+                                               for source in self.sources[first:last + 1]]
+
+    def update_labels(self):
+        """Shows labels of traced sources picked by the label grid, touching only labels that change."""
+
+        placed = self.label_grid.update(self.marker_x, self.marker_y, self.shown & self.traced, self.label_priority)
+
+        if self.marker_layer is not None:
+            self.marker_layer.set_labels(placed)
+            return
+
+        for i in np.flatnonzero(placed[:len(self.source_items)] != self.drawn_labels).tolist():
+            self.source_items[i][2].setVisible(bool(placed[i]))
+        self.drawn_labels = placed[:len(self.source_items)].copy()
+
+    def use_marker_layer(self):
+        """Replaces per-source items with a single item painting all objects."""
+
+        for item in (item for items in self.source_items for item in items):
+            self.removeItem(item)
+        self.source_items = []
+
+        self.marker_layer = MarkerLayer(self.types, self.sources, (0, self.engine.pole_offset()),
+                                        self.engine.path_diameters(), parent_scene=self)
+        self.marker_layer.set_positions(self.marker_x, self.marker_y, self.shown)
+        self.add_chart_item(self.marker_layer)
+        self.body_path_key = None
+        self.update_body_paths()
+
+    def add_sources(self, sources):
+        """Adds sources to the source list and the sky view."""
+
+        first = len(self.sources)
+        self.source_model.add_sources(sources)
+        self.engine.add_sources(sources)
+        self.rising = np.concatenate((self.rising, self.engine.reaches_elevation(self.elevation_range[0], first)))
+        self.marker_x, self.marker_y, self.shown = self.sky_positions()
+        self.source_indices.update((source[0], i) for i, source in enumerate(sources, start=first))
+
+        if self.marker_layer is not None:
+            self.marker_layer.add_sources(sources, self.engine.path_diameters())
+            self.marker_layer.set_positions(self.marker_x, self.marker_y, self.shown)
+        elif len(self.sources) > BATCHED_MARKER_THRESHOLD:
+            self.use_marker_layer()
+        else:
+            self.add_source_items(first)
+
+        self.update_label_options(first, len(self.sources) - 1)
+        self.update_labels()
+        self.update_body_paths()
+        self.name_index.extend(len(self.sources))
+        if self.menu_rows is not None:
+            self.search_sources(self.search_input.text())
+        else:
+            self.refresh_menu()
+
+        # Site workers and tiles hold the previous source arrays
+        self.close_site_pool()
+        if self.tiles:
+            self.toggle_tiles()
+            self.toggle_tiles()
+
+    def start_import(self):
+        """Asks for a catalog file and imports it in the background."""
+
+        if self.importer is not None:
+            return
+
+        file, _ = QFileDialog.getOpenFileName(self.views()[0] if self.views() else None, "Import catalog", "",
+                                              "Catalogs (*.csv *.csv.gz);;All files (*)")
+        if not file:
+            return
+        max_magnitude, accepted = QInputDialog.getDouble(self.views()[0] if self.views() else None, "Import catalog",
+                                                         "Faintest magnitude:", 6.0, -30, 30, 1)
+        if not accepted:
+            return
+
+        self.importer = CatalogImporter(file, max_magnitude, self.coordinates[0], self.elevation_range[0])
+        self.importer.batch_ready.connect(self.on_import_batch)
+        self.importer.failed.connect(self.on_import_failed)
+        self.importer.finished.connect(self.on_import_finished)
+        self.import_count = 0
+        self.import_timer.setInterval(IMPORT_APPLY_INTERVAL)
+        self.import_text.set_text("Importing: 0% (Esc to cancel)")
+        self.importer.start()
+
+    def cancel_import(self):
+        """Stops a running catalog import, keeping sources added so far."""
+
+        if self.importer is not None:
+            self.importer.requestInterruption()
+
+    def on_import_batch(self, sources, progress):
+        """Queues a batch of imported sources, to be added with the following batches by the import timer."""
+
+        if sources:
+            self.import_pending.extend(sources)
+            self.import_count += len(sources)
+            if not self.import_timer.isActive():
+                self.import_timer.start()
+        self.import_text.set_text(f"Importing: {progress * 100:.0f}% ({self.import_count} sources, Esc to cancel)")
+
+    def apply_import(self):
+        """Adds all queued imported sources at once.
+
+        The next call waits longer when adding took long, so that adding keeps to IMPORT_APPLY_SHARE of the time.
+        """
+
+        if not self.import_pending:
+            return
+
+        sources, self.import_pending = self.import_pending, []
+        start = time.perf_counter()
+        self.add_sources(sources)
+        elapsed = (time.perf_counter() - start) * 1000
+        self.import_timer.setInterval(max(IMPORT_APPLY_INTERVAL, int(elapsed * (1 - IMPORT_APPLY_SHARE)
+                                                                         / IMPORT_APPLY_SHARE)))
+
+    def on_import_failed(self, message):
+        """Reports a failed catalog import."""
+
+        print("Import failed:", message)
+        self.import_text.set_text(f"Import failed: {message}")
+
+    def on_import_finished(self):
+        """Adds the last queued sources and reports the end of a catalog import."""
+
+        self.import_timer.stop()
+        self.apply_import()
+        if not self.import_text.toPlainText().startswith("Import failed"):
+            self.import_text.set_text(f"Imported {self.import_count} sources"
+                                      + (" (cancelled)" if self.importer.isInterruptionRequested() else ""))
+        self.importer = None
+
+    @profiler.timed("keyPressEvent")
     def keyPressEvent(self, event):
-        """Handles key presses."""
+        """Handles key presses, leaving them to text inputs that have focus, e.g. the search box."""
 
-        if event.key() in (Qt.Key.Key_Left, Qt.Key.Key_A):
+        focus_item = self.focusItem()
+        if isinstance(focus_item, QGraphicsProxyWidget) and isinstance(focus_item.widget(), QLineEdit):
+            super().keyPressEvent(event)
+        elif event.key() in (Qt.Key.Key_Left, Qt.Key.Key_A):
             self.local_time -= 3600     # Rewind time by 1 hour
             self.update_time()
         elif event.key() in (Qt.Key.Key_Right, Qt.Key.Key_D):
@@ -187,172 +700,331 @@ class GUIScene(QGraphicsScene):
             self.local_time = time.time()   # Reset to current time
             self.update_time()
         elif event.key() in (Qt.Key.Key_Up, Qt.Key.Key_W):
-            # TODO: Scroll source list up
-            pass
+            self.scroll_menu(-1)    # Scroll source list up
         elif event.key() in (Qt.Key.Key_Down, Qt.Key.Key_S):
-            # TODO: Scroll source list down
-            pass
+            self.scroll_menu(1)     # Scroll source list down
+        elif event.key() == Qt.Key.Key_PageUp:
+            self.scroll_menu(-MENU_ROWS)
+        elif event.key() == Qt.Key.Key_PageDown:
+            self.scroll_menu(MENU_ROWS)
+        elif event.key() == Qt.Key.Key_I:
+            self.start_import()     # Import sources from a catalog file
+        elif event.key() == Qt.Key.Key_Escape:
+            self.cancel_import()
+        elif event.key() == Qt.Key.Key_P:
+            self.toggle_playback()  # Start or stop animated playback
+        elif event.key() in (Qt.Key.Key_Plus, Qt.Key.Key_Equal):
+            self.playback_speed = min(self.playback_speed + 1, len(PLAYBACK_SPEEDS) - 1)
+            self.update_playback_text()
+        elif event.key() == Qt.Key.Key_Minus:
+            self.playback_speed = max(self.playback_speed - 1, 0)
+            self.update_playback_text()
+        elif event.key() == Qt.Key.Key_R:
+            self.playback_direction = -self.playback_direction  # Reverse playback direction
+            self.update_playback_text()
+        elif event.key() == Qt.Key.Key_F3:
+            self.toggle_overlay()   # Show or hide performance overlay
+        elif event.key() == Qt.Key.Key_O:
+            self.set_site((self.site_index + 1) % len(self.sites))  # Switch to next observation site
+        elif event.key() == Qt.Key.Key_T:
+            self.toggle_tiles()     # Show all sites side by side
         else:
             super().keyPressEvent(event)
 
+    def toggle_playback(self):
+        """Starts or stops animated playback of time."""
+
+        playing = not self.playback_timer.isActive()
+        if playing:
+            self.playback_clock = time.perf_counter()
+            self.playback_timer.start()
+        else:
+            self.playback_timer.stop()
+
+        # Many items move every frame, so repaint the whole view once instead of merging their areas
+        for view in self.views():
+            view.setViewportUpdateMode(QGraphicsView.ViewportUpdateMode.FullViewportUpdate if playing
+                                       else QGraphicsView.ViewportUpdateMode.MinimalViewportUpdate)
+        self.update_playback_text()
+
+    def on_playback_frame(self):
+        """Advances time by the real time elapsed since the previous frame.
+
+        Time is taken from the clock rather than counted in timer ticks, so frames that overrun the interval skip
+        ahead instead of falling behind.
+        """
+
+        now = time.perf_counter()
+        self.local_time += (now - self.playback_clock) * PLAYBACK_SPEEDS[self.playback_speed] * self.playback_direction
+        self.playback_clock = now
+        self.update_time()
+
+    def update_playback_text(self):
+        """Shows playback state and speed."""
+
+        state = "Playing" if self.playback_timer.isActive() else "Paused"
+        self.playback_text.set_text(f"{state} {PLAYBACK_SPEEDS[self.playback_speed] * self.playback_direction}x"
+                                    f" (P, +/-, R)")
+
+    def toggle_overlay(self):
+        """Shows or hides the performance overlay."""
+
+        if self.overlay_timer.isActive():
+            self.overlay_timer.stop()
+            self.overlay_text.setVisible(False)
+        else:
+            self.update_overlay()
+            self.overlay_text.setVisible(True)
+            self.overlay_timer.start()
+
+    def update_overlay(self):
+        """Shows recent frame, paint and update times along with item counts."""
+
+        frame_ms = profiler.mean_ms("frame")
+        self.overlay_text.set_text(f"Frame: {frame_ms:.1f} ms ({1000 / frame_ms if frame_ms else 0:.0f} fps)\n"
+                                   f"Paint: {profiler.mean_ms('paint'):.1f} ms\n"
+                                   f"Update: {profiler.mean_ms('update_time'):.1f} ms\n"
+                                   f"Items: {len(self.items())}, sources: {len(self.sources)}")
+
+    def wheelEvent(self, event):
+        """Scrolls the source list with the mouse wheel over the menu."""
+
+        if event.scenePos().x() > self.menu_left:
+            self.scroll_menu(-round(event.delta() / 120) * 3)
+            event.accept()
+        else:
+            super().wheelEvent(event)
+
+    def scroll_menu(self, rows):
+        """Scrolls the source list by given number of rows."""
+
+        menu_offset = max(0, min(self.menu_offset + rows, self.menu_row_count() - MENU_ROWS))
+        if menu_offset != self.menu_offset:
+            self.menu_offset = menu_offset
+            self.refresh_menu()
+
+    def menu_row_count(self):
+        """Returns the number of sources listed in the menu, all of them or the search results."""
+
+        return self.source_model.rowCount() if self.menu_rows is None else len(self.menu_rows)
+
+    def refresh_menu(self):
+        """Binds the menu rows to the sources currently scrolled into view."""
+
+        row_count = self.menu_row_count()
+        for i, menu_item in enumerate(self.menu_items):
+            row = self.menu_offset + i
+            for element in menu_item[1:]:
+                element.setVisible(row < row_count)
+            if row >= row_count:
+                continue
+
+            index = self.source_model.index(row if self.menu_rows is None else int(self.menu_rows[row]))
+            menu_item[0] = index.row()
+            menu_item[1].set_text(index.data())
+            menu_item[1].setDefaultTextColor(QColor("#FF8000" if index.row() == self.selected_source else "#F0F0F0"))
+
+            # Update widgets without triggering change handlers
+            menu_item[2].blockSignals(True)
+            menu_item[2].setChecked(bool(index.data(SourceListModel.TraceRole)))
+            menu_item[2].blockSignals(False)
+            menu_item[3].blockSignals(True)
+            menu_item[3].setValue(index.data(SourceListModel.TypeRole))
+            menu_item[3].blockSignals(False)
+
+        self.menu_position_text.set_text(f"{min(self.menu_offset + 1, row_count)}"
+                                         f"-{min(self.menu_offset + MENU_ROWS, row_count)} / {row_count}"
+                                         + ("" if self.menu_complete else "+"))
+
+    def search_sources(self, text):
+        """Lists only sources whose name contains given text in the menu, or all sources for empty text."""
+
+        if text.strip():
+            self.menu_rows, self.menu_complete = self.name_index.search(text)
+        else:
+            self.menu_rows, self.menu_complete = None, True
+        self.menu_offset = 0
+        self.refresh_menu()
+
+    def select_source(self, index):
+        """Lists all sources again scrolled to given source, and highlights its marker."""
+
+        self.selected_source = index
+        self.search_input.blockSignals(True)
+        self.search_input.clear()
+        self.search_input.blockSignals(False)
+        self.menu_rows, self.menu_complete = None, True
+        self.menu_offset = max(0, min(index - MENU_ROWS // 2, self.menu_row_count() - MENU_ROWS))
+        self.refresh_menu()
+        self.update_highlight()
+
+    def update_highlight(self):
+        """Moves the ring around the marker of the selected source, shown while the source is."""
+
+        if self.selected_source is None:
+            return
+
+        x, y = float(self.marker_x[self.selected_source]), float(self.marker_y[self.selected_source])
+        self.highlight.setRect(x - HIGHLIGHT_DIAMETER / 2, y - HIGHLIGHT_DIAMETER / 2, HIGHLIGHT_DIAMETER,
+                               HIGHLIGHT_DIAMETER)
+        self.highlight.setVisible(bool(self.shown[self.selected_source]))
+
+    def mousePressEvent(self, event):
+        """Selects a source by clicking its name in the source menu."""
+
+        item = self.itemAt(event.scenePos(), QTransform())
+        menu_item = next((menu_item for menu_item in self.menu_items if menu_item[1] is item), None)
+        if menu_item is not None and event.button() == Qt.MouseButton.LeftButton:
+            self.select_source(menu_item[0])
+            event.accept()
+        else:
+            super().mousePressEvent(event)
+
+    def helpEvent(self, event):
+        """Shows rise, culmination and set times of a hovered source."""
+
+        item = self.itemAt(event.scenePos(), QTransform())
+        source_id = None
+        site_index = None
+        if isinstance(item, CenteredCircle):
+            source_id = item.source_id
+        elif isinstance(item, MarkerLayer):
+            source_id = item.source_at(item.mapFromScene(event.scenePos()))
+            site_index = next((tile[0] for tile in self.tiles if tile[3] is item), None)
+
+        if source_id is not None:
+            QToolTip.showText(event.screenPos(), self.source_summary(source_id, site_index))
+        else:
+            super().helpEvent(event)
+
+    def source_summary(self, index, site_index=None):
+        """Returns a text summary of source visibility around current time, at the selected or given site."""
+
+        if site_index is None:
+            min_elevation = self.elevation_range[0]
+            events = self.rise_set.events(self.local_time, min_elevation)
+            summary = f"{self.sources[index][0]}\n"
+        else:
+            min_elevation = self.sites[site_index][3]
+            events = self.site_events(site_index)
+            summary = f"{self.sources[index][0]} at {self.sites[site_index][0]}\n"
+
+        summary += (f"Culmination: {time.strftime('%H:%M', time.localtime(events['culmination'][index]))}"
+                    f" ({events['culmination_elevation'][index]:.1f}°)\n")
+
+        if events["hours_above"][index] == 0:
+            return summary + f"Never above {min_elevation:g}°"
+        if math.isnan(events["rise"][index]):
+            return summary + f"Always above {min_elevation:g}°"
+
+        return summary + (f"Rise: {time.strftime('%H:%M', time.localtime(events['rise'][index]))}\n"
+                          f"Set: {time.strftime('%H:%M', time.localtime(events['set'][index]))}\n"
+                          f"Above {min_elevation:g}°: {events['hours_above'][index]:.1f} h")
+
     def on_selection_change(self, state, index):
         """Handles visibility selection changes via checkboxes."""
 
         if state == 2:
             state = 1
 
-        self.source_items[self.menu_items[index][0]][0].setVisible(state)
-        self.source_items[self.menu_items[index][0]][2].setVisible(state)
-        self.sources[self.menu_items[index][0]][4] = state
+        self.source_model.set_trace(self.menu_items[index][0], state)
 
     def on_value_change(self, value, index):
         """Handles type selection changes."""
 
-        marker_rect = self.source_items[self.menu_items[index][0]][1].rect()
-        marker_d = self.types[value][0]
-        center_offset = (marker_d - marker_rect.width()) / 2
-        self.source_items[self.menu_items[index][0]][1].setRect(marker_rect.x() - center_offset,
-                                                                marker_rect.y() - center_offset,
-                                                                marker_d, marker_d)
-        self.source_items[self.menu_items[index][0]][1].setBrush(QBrush(QColor(self.types[value][1])))
-        self.sources[self.menu_items[index][0]][3] = value
-
-    def update_time(self):
-        """Updates GUI elements affected by time selection."""
-
-        self.local_input.setText(time.strftime("%Y-%m-%d %H:%M", time.localtime(self.local_time)))
-        self.utc_text.setPlainText(time.strftime("%Y-%m-%d %H:%M", time.gmtime(self.local_time)))
-        self.lst_text.setPlainText(time.strftime("%Y-%m-%d %H:%M", local_to_lst(self.local_time, self.coordinates)))
-
-        for i in range(len(self.sources)):
-            culmination_ratio = (self.sources[i][1] - (local_to_lst(self.local_time, self.coordinates).tm_hour
-                                                       + local_to_lst(self.local_time, self.coordinates).tm_min / 60
-                                                       + local_to_lst(self.local_time, self.coordinates).tm_sec / 3600)
-                                 ) / 24
-
-            x_offset = -math.sin(culmination_ratio * 2 * math.pi) * (90 - self.sources[i][2]) * self.degree_scaling
-            y_offset = math.cos(culmination_ratio * 2 * math.pi) * (90 - self.sources[i][2]) * self.degree_scaling
-
-            marker_rect = self.source_items[i][1].rect()
-            self.source_items[i][1].setRect(x_offset - marker_rect.width() / 2,
-                                            -(90 - self.coordinates[0]) * self.degree_scaling + y_offset
-                                            - marker_rect.height() / 2,
-                                            marker_rect.width(), marker_rect.height())
-
-            marker_rect_new = self.source_items[i][1].rect()
-            moved = (marker_rect_new.x() - marker_rect.x(), marker_rect_new.y() - marker_rect.y())
-            self.source_items[i][2].moveBy(moved[0], moved[1])
-
-
-def load_config(file=CONFIG_FILE):
-    """Loads config file."""
-
-    # Create config file if it doesn't exist yet
-    if not os.path.isfile(CONFIG_FILE):
-        shutil.copy("default_config.txt", CONFIG_FILE)
-    
-    with open(file, newline='', encoding="utf-8") as csv_file:
-        csv_reader = csv.reader(csv_file, delimiter='|')
-        next(csv_reader)  # Skip header row
-        for row in csv_reader:
-            print(f"Coordinates: {float(row[0]):.3f}° N, {float(row[1]):.3f}° E")
-            return float(row[0]), float(row[1]), float(row[2]), float(row[3]), int(row[4]), int(row[5]), float(row[6])
-
-
-def load_sources(file=SOURCE_FILE):
-    """Load and return the source list."""
-
-    # Create source file if it doesn't exist yet
-    if not os.path.isfile(SOURCE_FILE):
-        shutil.copy("default_sources.txt", SOURCE_FILE)
-
-    types = []
-    sources = []
-    with open(file, newline='', encoding="utf-8") as csv_file:
-        csv_reader = csv.reader(csv_file, delimiter='|')
-        next(csv_reader)  # Skip header row
-
-        data_type = 0
-        for row in csv_reader:
-            if len(row) == 0:
-                data_type += 1
-                next(csv_reader)
-                continue
-
-            if data_type == 0:
-                types.append((int(row[0]), row[1]))
-            elif data_type == 1:
-                right_ascension = row[1].split(':')
-                right_ascension = int(right_ascension[0]) + int(right_ascension[1]) / 60. + float(right_ascension[2]
-                                                                                                  ) / 3600
+        self.source_model.set_type(self.menu_items[index][0], value)
 
-                declination = row[2].split(':')
-                if declination[0][0] == '-':
-                    sign = -1
-                else:
-                    sign = 1
-                declination = sign * (int(declination[0][1:]) + int(declination[1]) / 60. + float(declination[2]) / 3600)
+    def on_source_change(self, top_left, bottom_right, roles):
+        """Applies trace and type changes from the source model to the scene."""
 
-                sources.append([row[0], right_ascension, declination, int(row[3]), int(row[4])])
+        for layer in [self.marker_layer] + [tile[3] for tile in self.tiles]:
+            if layer is not None:
+                layer.update_sources(top_left.row(), bottom_right.row())
 
-    return types, sources
+        for i in range(top_left.row(), min(bottom_right.row() + 1, len(self.source_items))):
+            path, marker, text = self.source_items[i]
+            path.setVisible(self.sources[i][4])
 
+            marker_rect = marker.rect()
+            marker_d = self.types[self.sources[i][3]][0]
+            center_offset = (marker_d - marker_rect.width()) / 2
+            marker.setRect(marker_rect.x() - center_offset, marker_rect.y() - center_offset, marker_d, marker_d)
+            marker.setBrush(QBrush(QColor(self.types[self.sources[i][3]][1])))
 
-def save_sources(types, sources, file=SOURCE_FILE):
-    """Saves the source list with current options."""
+        self.update_label_options(top_left.row(), bottom_right.row())
+        self.update_labels()
+        self.refresh_menu()
 
-    with open(file, 'w', newline='', encoding="utf-8") as csv_file:
-        csv_writer = csv.writer(csv_file, delimiter='|')
-        csv_writer.writerow(["Source Size", "Source Color"])    # Write type header row
-        for source_type in types:
-            csv_writer.writerow(source_type)
+    @profiler.timed("update_time")
+    def update_time(self):
+        """Updates GUI elements affected by time selection."""
 
-        csv_writer.writerow([])
-        csv_writer.writerow(["Source", "Right Ascension", "Declination", "Type", "Trace"])  # Write source header row
-        for source in sources:
-            right_ascension = f"{int(source[1]):02d}:{int((source[1] % 1) * 60):02d}" \
-                              f":{((((source[1] % 1) * 60) % 1) * 60):06.3f}"
+        self.local_input.setText(time.strftime("%Y-%m-%d %H:%M", time.localtime(self.local_time)))
+        self.utc_text.setPlainText(time.strftime("%Y-%m-%d %H:%M", time.gmtime(self.local_time)))
+        self.lst_text.setPlainText(time.strftime("%Y-%m-%d %H:%M", local_to_lst(self.local_time, self.coordinates)))
 
-            if source[2] >= 0:
-                declination = f"+{int(source[2]):02d}:{int((source[2] % 1) * 60):02d}" \
-                              f":{((((source[2] % 1) * 60) % 1) * 60):06.3f}"
-            else:
-                declination = f"-{int(-source[2]):02d}:{int((-source[2] % 1) * 60):02d}" \
-                              f":{((((-source[2] % 1) * 60) % 1) * 60):06.3f}"
+        # The sky chart of the selected site is hidden while all sites are tiled
+        if self.tiles:
+            self.update_tiles()
+            return
 
-            csv_writer.writerow((source[0], right_ascension, declination, source[3], source[4]))
+        # Compute all positions in one batch, then only touch items that are shown or change visibility
+        x_old, y_old = self.marker_x, self.marker_y
+        self.marker_x, self.marker_y, self.shown = self.sky_positions()
 
-    print("Sources saved!")
-    return 0
+        if self.marker_layer is not None:
+            self.marker_layer.set_positions(self.marker_x, self.marker_y, self.shown)
+        else:
+            self.update_source_items()
+        self.update_labels()
+        self.update_body_paths()
+        self.update_highlight()
 
+        self.update_plan_overlay(x_old, y_old)
 
-def utc_to_lst(utc_time, coords):
-    """Converts UTC time to LST."""
+    def update_plan_overlay(self, x_old=None, y_old=None):
+        """Shows observation order of the planned night containing current time."""
 
-    time_since_vernal_equinox = (time.mktime(utc_time)
-                                 - time.mktime(time.strptime(VERNAL_EQUINOX_UTC, "%Y-%m-%d %H:%M")))
-    equinox_offset = 12 + time_since_vernal_equinox / (365 * 24 * 60 * 60) * 24
-    longitude_offset = coords[1] / 360 * 24
+        night = next((night for night, (start, end) in self.plan_nights.items() if start <= self.local_time <= end),
+                     None)
 
-    return time.gmtime(calendar.timegm(utc_time) + (equinox_offset + longitude_offset + LST_FIX) * 60 * 60)
+        if night != self.plan_night:
+            for _, item, _, _ in self.plan_items:
+                self.removeItem(item)
+            self.plan_items = []
+            self.plan_night = night
 
+            for entry_night, order, name, start, end in self.plan:
+                if entry_night != night or name not in self.source_indices:
+                    continue
 
-def local_to_lst(local_time, coords):
-    """Converts local civil time to LST."""
+                i = self.source_indices[name]
+                item = Text(self.marker_x[i] + 12, self.marker_y[i] - 12, f"{order}", font_size=8,
+                            color="#FF8000", layer=3)
+                self.add_chart_item(item)
+                self.plan_items.append((i, item, start, end))
+        elif x_old is not None:
+            for i, item, _, _ in self.plan_items:
+                item.moveBy(float(self.marker_x[i] - x_old[i]), float(self.marker_y[i] - y_old[i]))
 
-    utc_time = time.gmtime(local_time)
-    return utc_to_lst(utc_time, coords)
+        # Highlight the observation in progress
+        for _, item, start, end in self.plan_items:
+            item.setDefaultTextColor(QColor("#FF0000" if start <= self.local_time < end else "#FF8000"))
 
 
 def main():
+    parser = argparse.ArgumentParser(description="Visualize astronomical sources' paths through the sky.")
+    parser.add_argument("--trace", default=None, help="write a Chrome trace-event JSON file of hot paths on exit")
+    args, qt_args = parser.parse_known_args()
+
     # Start with current time
     local_time = time.time()
     print("Local time:", time.strftime("%Y-%m-%d %H:%M", time.localtime(local_time)))
     print()
 
     # Handle GUI
-    app = QApplication(sys.argv)
-    view = GUIView(local_time)
+    app = QApplication(sys.argv[:1] + qt_args)
+    view = GUIView(local_time, args.trace)
     view.show()
     sys.exit(app.exec())
 
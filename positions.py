@@ -0,0 +1,350 @@
+import calendar
+import collections
+import time
+
+import numpy as np
+
+from ephemeris import body_index, body_places
+from precession import J2000_YEAR, apply_proper_motion, day_number, day_year, precess, unit_vectors
+from sidereal import local_sidereal_hours
+
+APPARENT_CACHE_DAYS = 4     # Number of most recent days whose source places are kept
+BODY_PATH_STEP = 600    # Time step of drawn paths of moving sources in seconds
+
+
+class PositionEngine:
+    """Batched position computation for all sources, independent of the GUI."""
+
+    def __init__(self, sources, coords, deg_scale=1.0):
+        self.coordinates = coords
+        self.degree_scaling = deg_scale
+        self.set_source_arrays(*source_arrays(sources))
+
+    def add_sources(self, sources):
+        """Appends coordinates of new sources.
+
+        Only the new sources are moved to the cached days and the current time, so importing a catalog in batches
+        does not recompute the places of sources added before.
+        """
+
+        first = len(self.catalog_right_ascension)
+        new_arrays = source_arrays(sources)
+        (self.catalog_right_ascension, self.catalog_declination, self.epoch, self.pm_right_ascension,
+         self.pm_declination, self.body) = (np.concatenate((old, new)) for old, new in zip(self.catalog_arrays(),
+                                                                                           new_arrays))
+
+        new_bodies = np.flatnonzero(new_arrays[5] >= 0)
+        self.body_indices = np.concatenate((self.body_indices, new_bodies + first))
+        self.bodies = np.concatenate((self.bodies, new_arrays[5][new_bodies].astype(np.int64)))
+        self.body_time = None
+
+        # Groups of sources added before only change number when new epochs sort before theirs
+        epochs = np.union1d(self.epochs, new_arrays[2])
+        if len(epochs) != len(self.epochs):
+            self.epoch_groups = np.searchsorted(epochs, self.epochs)[self.epoch_groups]
+            self.epochs = epochs
+        self.epoch_groups = np.concatenate((self.epoch_groups, np.searchsorted(epochs, new_arrays[2])))
+        self.has_proper_motion = self.has_proper_motion or bool(np.any(new_arrays[3]) or np.any(new_arrays[4]))
+        if self.catalog_vectors is not None:
+            self.catalog_vectors = np.concatenate((self.catalog_vectors, unit_vectors(*new_arrays[:2])), axis=1)
+
+        for day, places in self.apparent_cache.items():
+            self.apparent_cache[day] = tuple(np.concatenate((old, new))
+                                             for old, new in zip(places, self.apparent_places(day, first)))
+
+        if self.day is None:
+            self.right_ascension = self.catalog_right_ascension
+            self.declination = self.catalog_declination
+            self.path_radius, self.sin_declination, self.cos_declination = (
+                np.concatenate((old, new)) for old, new in zip(
+                    (self.path_radius, self.sin_declination, self.cos_declination),
+                    declination_terms(new_arrays[1], self.degree_scaling)))
+        else:
+            self.use_places(self.day)
+
+    def set_source_arrays(self, right_ascension, declination, epoch, pm_right_ascension, pm_declination, body):
+        """Uses given catalog arrays of all sources, e.g. views of shared memory, without copying them.
+
+        Coordinates are in hours and degrees at given Julian epochs, with proper motions in mas/yr. Solar system
+        bodies have their body number in the body array, -1 for other sources, and their coordinates are ignored.
+        """
+
+        self.catalog_right_ascension = right_ascension
+        self.catalog_declination = declination
+        self.epoch = epoch
+        self.pm_right_ascension = pm_right_ascension
+        self.pm_declination = pm_declination
+        self.body = body
+
+        # Bodies move along their orbits, so their places are replaced for each time separately
+        self.body_indices = np.flatnonzero(body >= 0)
+        self.bodies = body[self.body_indices].astype(np.int64)
+        self.body_time = None
+
+        # Sources are precessed in groups of equal epoch, and catalog unit vectors are reused without proper motion
+        self.epochs, self.epoch_groups = np.unique(epoch, return_inverse=True)
+        self.has_proper_motion = bool(np.any(pm_right_ascension) or np.any(pm_declination))
+        self.catalog_vectors = None
+        self.apparent_cache = collections.OrderedDict()
+
+        # Positions are catalog coordinates until moved to a date
+        self.day = None
+        self.right_ascension = right_ascension
+        self.declination = declination
+        self.update_declination_terms()
+
+    def catalog_arrays(self):
+        """Returns catalog coordinate, epoch and proper motion arrays as given to set_source_arrays."""
+
+        return (self.catalog_right_ascension, self.catalog_declination, self.epoch, self.pm_right_ascension,
+                self.pm_declination, self.body)
+
+    def share_sources(self, engine):
+        """Uses the source arrays of another engine of the same scale, e.g. one of another site, without copying."""
+
+        self.__dict__.update({name: value for name, value in engine.__dict__.items()
+                              if name not in ("coordinates", "degree_scaling")})
+
+    def set_date(self, unix_time):
+        """Moves all sources to their mean place of date, applying proper motion and precession.
+
+        Places are computed once per UTC day, and the places of the few most recent days are kept, so moving
+        back and forth in time only costs a lookup.
+        """
+
+        day = day_number(unix_time)
+        if day == self.day:
+            return
+
+        if day in self.apparent_cache:
+            self.apparent_cache.move_to_end(day)
+        else:
+            self.apparent_cache[day] = self.apparent_places(day)
+            if len(self.apparent_cache) > APPARENT_CACHE_DAYS:
+                self.apparent_cache.popitem(last=False)
+
+        self.use_places(day)
+
+    def apparent_places(self, day, first=0):
+        """Returns places of date of the sources from given index on, as cached per day.
+
+        Places are right ascensions, declinations, chart path radii and declination sines and cosines.
+        """
+
+        if self.has_proper_motion:
+            vectors = unit_vectors(*apply_proper_motion(
+                self.catalog_right_ascension[first:], self.catalog_declination[first:], self.pm_right_ascension[first:],
+                self.pm_declination[first:], day_year(day) - self.epoch[first:]))
+        else:
+            if self.catalog_vectors is None:
+                self.catalog_vectors = unit_vectors(self.catalog_right_ascension, self.catalog_declination)
+            vectors = self.catalog_vectors[:, first:]
+
+        vectors = precess(vectors, self.epoch_groups[first:], self.epochs, day)
+        right_ascension = np.degrees(np.arctan2(vectors[1], vectors[0])) / 15 % 24
+        sin_declination = np.clip(vectors[2], -1, 1)
+        declination = np.degrees(np.arcsin(sin_declination))
+
+        return (right_ascension, declination, (90 - declination) * self.degree_scaling, sin_declination,
+                np.sqrt(1 - sin_declination ** 2))
+
+    def use_places(self, day):
+        """Sets all sources to their cached places of a day."""
+
+        self.day = day
+        (self.right_ascension, self.declination, self.path_radius, self.sin_declination,
+         self.cos_declination) = self.apparent_cache[day]
+
+        # Places of bodies are written into own copies, keeping the cached places of the day intact
+        if len(self.body_indices):
+            for name in ("right_ascension", "declination", "path_radius", "sin_declination", "cos_declination"):
+                setattr(self, name, getattr(self, name).copy())
+            self.body_time = None
+
+    def set_time(self, unix_time):
+        """Moves all sources to given time, fixed sources to their place of the day and bodies along their orbits."""
+
+        self.set_date(unix_time)
+        if len(self.body_indices) == 0 or unix_time == self.body_time:
+            return
+
+        right_ascension, declination = body_places(self.bodies, unix_time)
+        self.right_ascension[self.body_indices] = right_ascension
+        self.declination[self.body_indices] = declination
+        self.path_radius[self.body_indices] = (90 - declination) * self.degree_scaling
+        self.sin_declination[self.body_indices] = np.sin(np.radians(declination))
+        self.cos_declination[self.body_indices] = np.cos(np.radians(declination))
+        self.body_time = unix_time
+
+    def update_declination_terms(self):
+        """Precomputes per-source terms that only depend on declination."""
+
+        self.path_radius, self.sin_declination, self.cos_declination = declination_terms(self.declination,
+                                                                                          self.degree_scaling)
+
+    def __len__(self):
+        return len(self.right_ascension)
+
+    def pole_offset(self):
+        """Returns the vertical chart offset of the celestial pole."""
+
+        return -(90 - self.coordinates[0]) * self.degree_scaling
+
+    def path_diameters(self):
+        """Returns the diameters of all source paths around the celestial pole."""
+
+        return self.path_radius * 2
+
+    def marker_offsets(self, lst_hours):
+        """Returns x/y offsets of all sources from the celestial pole at given LST."""
+
+        culmination_angle = (self.right_ascension - lst_hours) * (2 * np.pi / 24)
+
+        return -np.sin(culmination_angle) * self.path_radius, np.cos(culmination_angle) * self.path_radius
+
+    def reaches_elevation(self, min_elevation, first=0):
+        """Returns whether each source from given index on culminates at or above given elevation at all.
+
+        Bodies change declination over time, so they are always taken to reach it.
+        """
+
+        reaches = 90 - np.abs(self.coordinates[0] - self.declination[first:]) >= min_elevation
+        reaches[self.body_indices[self.body_indices >= first] - first] = True
+        return reaches
+
+    def altitude_azimuth(self, lst_hours, unix_time=None):
+        """Returns altitudes and azimuths of all sources in degrees for one or more LST values.
+
+        An array of LST values gives arrays shaped (time, source). Bodies follow their orbits if the Unix times of
+        the LST values are given, and stay at their current place otherwise.
+        """
+
+        lst_hours = np.asarray(lst_hours, dtype=np.float64)[..., None]
+        altitude, azimuth = horizontal_coordinates(lst_hours - self.right_ascension, self.declination,
+                                                   self.coordinates[0])
+
+        if unix_time is not None and len(self.body_indices):
+            right_ascension, declination = body_places(self.bodies, unix_time)
+            altitude[..., self.body_indices], azimuth[..., self.body_indices] = horizontal_coordinates(
+                lst_hours - right_ascension, declination, self.coordinates[0])
+
+        return altitude, azimuth
+
+    def body_paths(self, start_time, end_time, step):
+        """Returns chart x/y positions of all bodies shaped (time, body) over given time range."""
+
+        timestamps = np.arange(start_time, end_time + step, step)
+        right_ascension, declination = body_places(self.bodies, timestamps)
+        culmination_angle = (right_ascension - lst_hours(timestamps, self.coordinates)[:, None]) * (2 * np.pi / 24)
+        path_radius = (90 - declination) * self.degree_scaling
+
+        return -np.sin(culmination_angle) * path_radius, np.cos(culmination_angle) * path_radius + self.pole_offset()
+
+    def marker_positions(self, local_time):
+        """Returns chart x/y positions of all sources at given local time."""
+
+        self.set_time(local_time)
+        x_offsets, y_offsets = self.marker_offsets(lst_hours(local_time, self.coordinates))
+        return x_offsets, y_offsets + self.pole_offset()
+
+    def sky_positions(self, local_time, min_elevation=0):
+        """Returns chart x/y positions of all sources and whether each is shown at given local time.
+
+        Sources are shown when they are at or above given elevation and inside the drawn 90° from zenith.
+        """
+
+        self.set_time(local_time)
+        culmination_angle = (self.right_ascension - lst_hours(local_time, self.coordinates)) * (2 * np.pi / 24)
+        cos_angle = np.cos(culmination_angle)
+        x = -np.sin(culmination_angle) * self.path_radius
+        y = cos_angle * self.path_radius + self.pole_offset()
+
+        latitude = np.radians(self.coordinates[0])
+        sin_altitude = self.sin_declination * np.sin(latitude) + self.cos_declination * np.cos(latitude) * cos_angle
+        shown = (sin_altitude >= np.sin(np.radians(min_elevation))) & (x * x + y * y <= (90 * self.degree_scaling) ** 2)
+
+        return x, y, shown
+
+
+def source_arrays(sources):
+    """Returns right ascension, declination, epoch, proper motion and body number arrays of a source list.
+
+    Sources without the optional epoch and proper motion entries are taken to be at J2000 without motion. Solar
+    system bodies have the body name in place of the right ascension.
+    """
+
+    right_ascension = np.fromiter((0 if isinstance(source[1], str) else source[1] for source in sources),
+                                  dtype=np.float64, count=len(sources))
+    declination = np.fromiter((source[2] for source in sources), dtype=np.float64, count=len(sources))
+    epoch = np.fromiter((source[5] if len(source) > 5 else J2000_YEAR for source in sources), dtype=np.float64,
+                        count=len(sources))
+    pm_right_ascension = np.fromiter((source[6] if len(source) > 5 else 0 for source in sources), dtype=np.float64,
+                                     count=len(sources))
+    pm_declination = np.fromiter((source[7] if len(source) > 5 else 0 for source in sources), dtype=np.float64,
+                                 count=len(sources))
+
+    body = np.fromiter((body_index(source[1]) if isinstance(source[1], str) else -1 for source in sources),
+                       dtype=np.float64, count=len(sources))
+
+    return right_ascension, declination, epoch, pm_right_ascension, pm_declination, body
+
+
+def declination_terms(declination, degree_scaling):
+    """Returns chart path radii and declination sines and cosines of declinations in degrees."""
+
+    return (90 - declination) * degree_scaling, np.sin(np.radians(declination)), np.cos(np.radians(declination))
+
+
+def horizontal_coordinates(hour_angle, declination, latitude):
+    """Returns altitudes and azimuths in degrees for hour angles in hours and declinations and latitude in degrees."""
+
+    hour_angle = np.radians(hour_angle * 15)
+    declination = np.radians(declination)
+    latitude = np.radians(latitude)
+
+    sin_altitude = (np.sin(latitude) * np.sin(declination)
+                    + np.cos(latitude) * np.cos(declination) * np.cos(hour_angle))
+    altitude = np.degrees(np.arcsin(np.clip(sin_altitude, -1, 1)))
+
+    # Azimuth measured from north towards east
+    azimuth = np.degrees(np.arctan2(-np.cos(declination) * np.sin(hour_angle),
+                                    np.sin(declination) * np.cos(latitude)
+                                    - np.cos(declination) * np.cos(hour_angle) * np.sin(latitude))) % 360
+
+    return altitude, azimuth
+
+
+def night_window(local_time):
+    """Returns the Unix timestamps of the local noons before and after given time, spanning its night."""
+
+    local = time.localtime(local_time)
+    start = local_time - ((local.tm_hour - 12) % 24 * 3600 + local.tm_min * 60 + local.tm_sec)
+    return start, start + 86400
+
+
+def lst_hours(unix_time, coords):
+    """Returns LST as fractional hours for a Unix timestamp or an array of them."""
+
+    return local_sidereal_hours(unix_time, coords[1])
+
+
+def parse_local_time(text):
+    """Parses local civil time in the GUI's input format."""
+
+    return time.mktime(time.strptime(text, "%Y-%m-%d %H:%M"))
+
+
+def utc_to_lst(utc_time, coords):
+    """Converts UTC time to LST."""
+
+    utc_seconds = calendar.timegm(utc_time)
+    lst_offset = (lst_hours(utc_seconds, coords) - utc_seconds % 86400 / 3600 + 12) % 24 - 12
+
+    return time.gmtime(utc_seconds + lst_offset * 60 * 60)
+
+
+def local_to_lst(local_time, coords):
+    """Converts local civil time to LST."""
+
+    utc_time = time.gmtime(local_time)
+    return utc_to_lst(utc_time, coords)
@@ -0,0 +1,90 @@
+import functools
+
+import numpy as np
+
+from sidereal import J2000_JD, UNIX_EPOCH_JD
+
+J2000_YEAR = 2000.0     # Julian epoch of catalog coordinates without a given epoch
+MAS_TO_DEGREES = 1 / 3.6e6
+
+# Precession angles zeta, z and theta as polynomials of Julian centuries since J2000 in arcseconds (IAU 1976)
+PRECESSION_ZETA = (0, 2306.2181, 0.30188, 0.017998)
+PRECESSION_Z = (0, 2306.2181, 1.09468, 0.018203)
+PRECESSION_THETA = (0, 2004.3109, -0.42665, -0.041833)
+
+
+def day_number(unix_time):
+    """Returns the number of the UTC day containing a Unix timestamp, used to share transforms within a day."""
+
+    return int(unix_time // 86400)
+
+
+def day_year(day):
+    """Returns the Julian epoch in years at noon of a UTC day number."""
+
+    return J2000_YEAR + ((day + 0.5) + UNIX_EPOCH_JD - J2000_JD) / 365.25
+
+
+def rotation_matrix(axis, angle):
+    """Returns the matrix rotating coordinate axes by given angle in radians around the x (0), y (1) or z (2) axis."""
+
+    cos_angle, sin_angle = np.cos(angle), np.sin(angle)
+    first, second = (axis + 1) % 3, (axis + 2) % 3
+
+    matrix = np.eye(3)
+    matrix[first, first] = matrix[second, second] = cos_angle
+    matrix[first, second] = sin_angle
+    matrix[second, first] = -sin_angle
+    return matrix
+
+
+def j2000_precession(year):
+    """Returns the matrix precessing mean equatorial unit vectors from J2000 to given Julian epoch."""
+
+    centuries = (year - J2000_YEAR) / 100
+    zeta, z, theta = (np.radians(np.polynomial.polynomial.polyval(centuries, angles) / 3600)
+                      for angles in (PRECESSION_ZETA, PRECESSION_Z, PRECESSION_THETA))
+
+    return rotation_matrix(2, -z) @ rotation_matrix(1, theta) @ rotation_matrix(2, -zeta)
+
+
+@functools.lru_cache(maxsize=1024)
+def precession_matrix(epoch, day):
+    """Returns the matrix precessing unit vectors from given Julian epoch to the mean equator of a UTC day.
+
+    Matrices are cached per epoch and day, evicting the least recently used ones.
+    """
+
+    return j2000_precession(day_year(day)) @ j2000_precession(epoch).T
+
+
+def unit_vectors(right_ascension, declination):
+    """Returns equatorial unit vectors shaped (3, source) for right ascensions in hours and declinations in degrees."""
+
+    right_ascension = np.radians(right_ascension * 15)
+    declination = np.radians(declination)
+    cos_declination = np.cos(declination)
+
+    return np.stack((cos_declination * np.cos(right_ascension), cos_declination * np.sin(right_ascension),
+                     np.sin(declination)))
+
+
+def apply_proper_motion(right_ascension, declination, pm_right_ascension, pm_declination, years):
+    """Returns coordinates moved by proper motions in mas/yr over given years, RA motion including cos(dec)."""
+
+    cos_declination = np.maximum(np.cos(np.radians(declination)), 1e-12)
+    return (right_ascension + pm_right_ascension * years * MAS_TO_DEGREES / cos_declination / 15,
+            np.clip(declination + pm_declination * years * MAS_TO_DEGREES, -90, 90))
+
+
+def precess(vectors, epoch_groups, epochs, day):
+    """Rotates unit vectors of sources grouped by catalog epoch to the mean equator of a UTC day.
+
+    The matrices of all epochs are stacked and applied to the whole catalog in one batched multiplication.
+    """
+
+    matrices = np.stack([precession_matrix(float(epoch), day) for epoch in epochs])
+    if len(epochs) == 1:
+        return matrices[0] @ vectors
+
+    return np.einsum('nij,jn->in', matrices[epoch_groups], vectors, optimize=True)
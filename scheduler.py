@@ -0,0 +1,243 @@
+import argparse
+import csv
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from catalog import load_config, load_sources
+from positions import PositionEngine, lst_hours, parse_local_time
+
+PLAN_FILE = "plan.csv"
+
+SLOT_SECONDS = 60   # Time resolution of the schedule
+DEEP_CANDIDATES = 5     # Number of best next targets considered by randomized search
+
+_worker_state = {}
+
+
+class NightPlanner:
+    """Builds observing plans for one night within the configured elevation window."""
+
+    def __init__(self, engine, el_range, exposures, settle_time, slew_rate, night_start, night_end):
+        self.engine = engine
+        self.night_start = night_start
+        self.exposure_slots = np.maximum(1, np.ceil(exposures / SLOT_SECONDS)).astype(np.int64)
+        self.settle_time = settle_time
+        self.slew_rate = slew_rate
+
+        # Elevations at every schedule slot, shape (slot, source)
+        slot_times = night_start + np.arange(int((night_end - night_start) // SLOT_SECONDS) + 1) * SLOT_SECONDS
+        engine.set_time(night_start)
+        altitude, _ = engine.altitude_azimuth(lst_hours(slot_times, engine.coordinates), slot_times)
+        visible = (altitude >= el_range[0]) & (altitude <= el_range[1])
+        n_slots, n_sources = visible.shape
+
+        # Whether a full exposure can start at each slot, requiring visibility at both of its ends
+        visible_count = np.concatenate((np.zeros((1, n_sources), dtype=np.int64),
+                                        np.cumsum(visible, axis=0, dtype=np.int64)))
+        end_slots = np.arange(n_slots)[:, None] + self.exposure_slots + 1
+        fits = end_slots <= n_slots
+        end_slots = np.minimum(end_slots, n_slots)
+        can_start = fits & (np.take_along_axis(visible_count, end_slots, axis=0)
+                            - visible_count[:-1] == self.exposure_slots + 1)
+
+        # Earliest possible start at or after each slot, n_slots if none
+        self.next_start = np.where(can_start, np.arange(n_slots)[:, None], n_slots)
+        self.next_start = np.concatenate((np.minimum.accumulate(self.next_start[::-1], axis=0)[::-1],
+                                          np.full((1, n_sources), n_slots)))
+
+        # Number of remaining start slots, used to observe sources with the least time left first
+        self.remaining_starts = np.concatenate((np.cumsum(can_start[::-1], axis=0)[::-1],
+                                                np.zeros((1, n_sources), dtype=np.int64)))
+        self.n_slots = n_slots
+
+        right_ascension = np.radians(engine.right_ascension * 15)
+        declination = np.radians(engine.declination)
+        self.unit_vectors = np.stack((np.cos(declination) * np.cos(right_ascension),
+                                      np.cos(declination) * np.sin(right_ascension),
+                                      np.sin(declination)), axis=1)
+
+    def slew_slots(self, previous):
+        """Returns slots needed to slew from given source to every source."""
+
+        if previous is None:
+            return np.zeros(len(self.engine), dtype=np.int64)
+
+        separation = np.degrees(np.arccos(np.clip(self.unit_vectors @ self.unit_vectors[previous], -1, 1)))
+        return np.ceil((self.settle_time + separation / self.slew_rate) / SLOT_SECONDS).astype(np.int64)
+
+    def plan(self, rng=None):
+        """Returns a plan as (source index, start slot, end slot) tuples.
+
+        Without a random generator the target finishing earliest is always taken next, which maximizes the
+        number of observations when slews are short. With one, any of the few earliest finishing targets may
+        be taken, giving a different candidate plan on every call.
+        """
+
+        observed = np.zeros(len(self.engine), dtype=bool)
+        source_range = np.arange(len(self.engine))
+        plan = []
+        slot = 0
+        previous = None
+
+        while slot < self.n_slots:
+            ready = np.minimum(slot + self.slew_slots(previous), self.n_slots)
+            start = self.next_start[ready, source_range]
+            end = start + self.exposure_slots
+            candidates = np.flatnonzero(~observed & (start < self.n_slots))
+            if len(candidates) == 0:
+                break
+
+            # Earliest finish first, sources running out of time first on ties
+            order = np.lexsort((self.remaining_starts[start[candidates], candidates], end[candidates]))
+            if rng is None:
+                chosen = candidates[order[0]]
+            else:
+                chosen = candidates[order[min(len(order) - 1, int(rng.exponential(1)) % DEEP_CANDIDATES)]]
+
+            plan.append((int(chosen), int(start[chosen]), int(end[chosen])))
+            observed[chosen] = True
+            slot = end[chosen]
+            previous = chosen
+
+        return plan
+
+    def search(self, time_budget, seed=0):
+        """Returns the best of randomized plans found within given time in seconds."""
+
+        best = self.plan()
+        rng = np.random.default_rng(seed)
+        deadline = time.perf_counter() + time_budget
+        while time.perf_counter() < deadline:
+            candidate = self.plan(rng)
+            if plan_score(candidate) > plan_score(best):
+                best = candidate
+
+        return best
+
+
+def plan_score(plan):
+    """Returns a sort key preferring more observations, then an earlier finish."""
+
+    return len(plan), -plan[-1][2] if plan else 0
+
+
+def _init_worker(sources, coords, el_range, exposures, settle_time, slew_rate):
+    """Stores shared planning inputs once per worker process."""
+
+    _worker_state["engine"] = PositionEngine(sources, coords)
+    _worker_state["arguments"] = (el_range, exposures, settle_time, slew_rate)
+
+
+def _plan_night(night_start, night_end, time_budget, seed):
+    """Plans one night in a worker process, greedy if no time budget is given."""
+
+    planner = NightPlanner(_worker_state["engine"], *_worker_state["arguments"], night_start, night_end)
+    plan = planner.plan() if time_budget <= 0 else planner.search(time_budget, seed)
+
+    return [(source, night_start + start * SLOT_SECONDS, night_start + end * SLOT_SECONDS)
+            for source, start, end in plan]
+
+
+def plan_nights(sources, config, nights, exposures, settle_time=30, slew_rate=2, time_budget=0, workers=None):
+    """Plans given (start, end) nights in parallel and returns one plan per night.
+
+    Each plan is a list of (source index, start time, end time) tuples with Unix timestamps. With a time
+    budget every worker searches randomized plans for that many seconds, and each night is searched by
+    several workers with different seeds when there are spare cores.
+    """
+
+    workers = workers or os.cpu_count() or 1
+    seeds_per_night = max(1, workers // len(nights)) if time_budget > 0 else 1
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(sources, (config[0], config[1]), (config[2], config[3]),
+                                       exposures, settle_time, slew_rate)) as executor:
+        futures = [[executor.submit(_plan_night, night_start, night_end, time_budget, seed)
+                    for seed in range(seeds_per_night)] for night_start, night_end in nights]
+
+        return [max((future.result() for future in night_futures), key=plan_score) for night_futures in futures]
+
+
+def load_exposures(sources, default_exposure, file=None):
+    """Returns exposure durations in seconds per source, read from an optional pipe-delimited file."""
+
+    exposures = np.full(len(sources), float(default_exposure))
+    if file is None:
+        return exposures
+
+    with open(file, newline='', encoding="utf-8") as csv_file:
+        csv_reader = csv.reader(csv_file, delimiter='|')
+        next(csv_reader)  # Skip header row
+        durations = {row[0]: float(row[1]) for row in csv_reader if len(row) >= 2}
+
+    for i, source in enumerate(sources):
+        exposures[i] = durations.get(source[0], exposures[i])
+
+    return exposures
+
+
+def save_plan(sources, plans, file=PLAN_FILE):
+    """Saves night plans to a pipe-delimited file."""
+
+    with open(file, 'w', newline='', encoding="utf-8") as csv_file:
+        csv_writer = csv.writer(csv_file, delimiter='|')
+        csv_writer.writerow(["Night", "Order", "Source", "Start", "End"])
+        for night, plan in enumerate(plans):
+            for order, (source, start, end) in enumerate(plan):
+                csv_writer.writerow((night + 1, order + 1, sources[source][0],
+                                     time.strftime("%Y-%m-%d %H:%M", time.localtime(start)),
+                                     time.strftime("%Y-%m-%d %H:%M", time.localtime(end))))
+
+
+def load_plan(file=PLAN_FILE):
+    """Loads a saved plan as (night, order, source name, start time, end time) tuples."""
+
+    if not os.path.isfile(file):
+        return []
+
+    plan = []
+    with open(file, newline='', encoding="utf-8") as csv_file:
+        csv_reader = csv.reader(csv_file, delimiter='|')
+        next(csv_reader)  # Skip header row
+        for row in csv_reader:
+            plan.append((int(row[0]), int(row[1]), row[2], time.mktime(time.strptime(row[3], "%Y-%m-%d %H:%M")),
+                         time.mktime(time.strptime(row[4], "%Y-%m-%d %H:%M"))))
+
+    return plan
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Plan observing nights within the configured elevation window.")
+    parser.add_argument("start", type=parse_local_time, help='local start of the first night, "YYYY-MM-DD HH:MM"')
+    parser.add_argument("end", type=parse_local_time, help='local end of the first night, "YYYY-MM-DD HH:MM"')
+    parser.add_argument("--nights", type=int, default=1, help="number of consecutive nights to plan")
+    parser.add_argument("--mode", choices=("greedy", "deep"), default="greedy", help="planning mode")
+    parser.add_argument("--budget", type=float, default=10, help="search time per night in seconds in deep mode")
+    parser.add_argument("--exposure", type=float, default=300, help="default exposure duration in seconds")
+    parser.add_argument("--exposures", default=None, help='pipe-delimited "Source|Exposure" file of durations')
+    parser.add_argument("--settle", type=float, default=30, help="fixed overhead per slew in seconds")
+    parser.add_argument("--slew-rate", type=float, default=2, help="slew rate in degrees per second")
+    parser.add_argument("--workers", type=int, default=None, help="number of worker processes")
+    parser.add_argument("--output", default=PLAN_FILE, help="plan file to write")
+    args = parser.parse_args()
+
+    config = load_config()
+    _, sources = load_sources()
+    if args.end <= args.start:
+        parser.error("night must end after it starts")
+
+    nights = [(args.start + i * 86400, args.end + i * 86400) for i in range(args.nights)]
+    exposures = load_exposures(sources, args.exposure, args.exposures)
+    plans = plan_nights(sources, config, nights, exposures, args.settle, args.slew_rate,
+                        args.budget if args.mode == "deep" else 0, args.workers)
+    save_plan(sources, plans, args.output)
+
+    print(f"Planned {sum(len(plan) for plan in plans)} observations over {len(plans)} nights "
+          f"({sum(len(plan) for plan in plans) / len(plans):.1f} per night), saved to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,166 @@
+import collections
+
+import numpy as np
+
+SEARCH_LIMIT = 200      # Largest number of results returned for a query
+CHECK_CHUNK = 500   # Number of candidate names checked first, doubling per step until enough results are found
+FILTER_RATIO = 8    # Largest ratio of names holding a gram to those holding the rarest one to filter by it
+PREFIX_GRAM = 1 << 16   # Marks grams holding the first one or two bytes of a word instead of a trigram
+REPEAT_LIMIT = 4    # Largest number of occurrences of a trigram in a name told apart by the index
+REPEAT_SHIFT = 24   # Bit position of the occurrence count in grams of trigrams occurring repeatedly
+
+
+def name_keys(names, first):
+    """Returns sorted unique gram << 32 | index keys of names numbered from given index.
+
+    Grams are every trigram of the lowercased UTF-8 names and the first one and two bytes of each word, words being
+    separated by ASCII characters other than letters and digits. Trigrams occurring several times in a name also
+    have a gram for each count from 2 up to REPEAT_LIMIT, so that texts repeating a trigram can be told apart.
+    """
+
+    encoded = [name.lower().encode("utf-8") for name in names]
+    data = np.frombuffer(b'\0'.join(encoded) + b'\0', dtype=np.uint8).astype(np.int64)
+    lengths = np.fromiter((len(name) for name in encoded), dtype=np.int64, count=len(encoded))
+    owners = np.repeat(np.arange(first, first + len(encoded), dtype=np.int64), lengths + 1)
+    owners[np.cumsum(lengths + 1) - 1] = -1     # Separators belong to no name
+    following = np.concatenate((data[1:], [0]))
+
+    # Trigrams within one name, counting their occurrences
+    starts = np.flatnonzero((owners[:-2] >= 0) & (owners[:-2] == owners[2:]))
+    trigrams = np.sort((data[starts] << 16 | data[starts + 1] << 8 | data[starts + 2]) << 32 | owners[starts])
+    first_occurrences = np.flatnonzero(np.concatenate(([True], trigrams[1:] != trigrams[:-1])))
+    counts = np.diff(np.append(first_occurrences, len(trigrams)))
+    keys = [trigrams[first_occurrences]]
+
+    # Repeated trigrams sort after all other grams, by count, so they are appended in order
+    repeated = [keys[0][counts >= count] + (count << REPEAT_SHIFT << 32) for count in range(2, REPEAT_LIMIT + 1)]
+
+    # First one and two bytes of each word
+    word_bytes = (data >= 0x80) | ((data >= ord('0')) & (data <= ord('9'))) | ((data >= ord('a')) & (data <= ord('z')))
+    word_bytes &= owners >= 0
+    word_starts = np.flatnonzero(word_bytes & ~np.concatenate(([False], word_bytes[:-1])))
+    keys.append((PREFIX_GRAM | data[word_starts] << 8) << 32 | owners[word_starts])
+    pairs = word_starts[owners[word_starts + 1] == owners[word_starts]]
+    keys.append((PREFIX_GRAM | data[pairs] << 8 | following[pairs]) << 32 | owners[pairs])
+
+    keys = np.sort(np.concatenate(keys))
+    return np.concatenate([keys[np.concatenate(([True], keys[1:] != keys[:-1]))]] + repeated)
+
+
+def query_grams(query):
+    """Returns the grams of a lowercased query, the word prefix gram for queries shorter than three bytes.
+
+    Trigrams occurring several times in the query give the gram of names holding them at least as often.
+    """
+
+    data = query.encode("utf-8")
+    if len(data) < 3:
+        return [PREFIX_GRAM | data[0] << 8 | (data[1] if len(data) > 1 else 0)]
+
+    counts = collections.Counter(data[i] << 16 | data[i + 1] << 8 | data[i + 2] for i in range(len(data) - 2))
+    return [min(count, REPEAT_LIMIT) << REPEAT_SHIFT | trigram if count > 1 else trigram
+            for trigram, count in counts.items()]
+
+
+class NameIndex:
+    """Finds sources whose name contains a search text, ignoring case.
+
+    Texts of one or two characters match the start of any word of a name, and longer texts any part of it. Grams of
+    all names are kept in a few sorted key arrays, a new one per batch of added names, with similar sized arrays
+    merged so that lookups stay logarithmic.
+    """
+
+    def __init__(self, name, count=0):
+        self.name = name    # Function returning the name of a source index
+        self.count = 0
+        self.segments = []  # Sorted key arrays of consecutive source index ranges, largest first
+        self.last_query = None
+        self.last_results = None
+        self.last_complete = False
+        self.extend(count)
+
+    def extend(self, count):
+        """Indexes names of sources appended since the last update."""
+
+        if count <= self.count:
+            return
+
+        self.segments.append(name_keys([self.name(i) for i in range(self.count, count)], self.count))
+        self.count = count
+        while len(self.segments) > 1 and len(self.segments[-1]) * 2 >= len(self.segments[-2]):
+            self.segments[-2:] = [np.sort(np.concatenate(self.segments[-2:]))]
+        self.last_query = None
+
+    def posting_ranges(self, gram, first=0, last=0xFFFFFFFF, within=None):
+        """Returns the key ranges of given gram and source index range in each segment.
+
+        Known key ranges of the gram in each segment can be given to only search inside them.
+        """
+
+        bounds = np.array([(gram << 32) + first, (gram << 32) + last + 1], dtype=np.int64)
+        within = within or [(0, len(segment)) for segment in self.segments]
+        return [(start + np.searchsorted(segment[start:end], bounds)).tolist()
+                for segment, (start, end) in zip(self.segments, within)]
+
+    def postings(self, ranges, chunk_size=None):
+        """Yields source indices of given key ranges of each segment in source order.
+
+        With a chunk size, they are yielded in chunks starting at that size and doubling, so that short walks stay
+        cheap and long ones need few steps.
+        """
+
+        for segment, (start, end) in zip(self.segments, ranges):
+            while start < end:
+                chunk_end = min(end, start + chunk_size) if chunk_size else end
+                yield segment[start:chunk_end] & 0xFFFFFFFF
+                start = chunk_end
+                chunk_size = chunk_size and chunk_size * 2
+
+    def search(self, text, limit=SEARCH_LIMIT):
+        """Returns indices of the first matching sources in source order, and whether they are all matches.
+
+        A text extending the previous one only rechecks the previous results if they were complete.
+        """
+
+        query = text.strip().lower()
+        if not query:
+            return np.arange(min(self.count, limit)), self.count <= limit
+
+        if (self.last_complete and self.last_query is not None and len(self.last_query.encode("utf-8")) >= 3
+                and query.startswith(self.last_query)):
+            chunks, grams = [self.last_results], []
+        else:
+            # Walk the names of the rarest gram, keeping those that hold all other grams of the text too
+            grams = sorted(((sum(end - start for start, end in ranges), gram, ranges) for gram, ranges in
+                            ((gram, self.posting_ranges(gram)) for gram in query_grams(query))))
+            chunks = self.postings(grams[0][2], CHECK_CHUNK)
+            if len(query.encode("utf-8")) <= 3:
+                results = np.concatenate([np.zeros(0, dtype=np.int64)] + list(self.postings(
+                    [(start, min(end, start + limit)) for start, end in grams[0][2]])))[:limit]
+                return self.remember(query, results, grams[0][0] <= limit)   # Single grams need no checking
+
+        # Grams held by many more names filter out too few candidates to be worth looking up
+        filter_grams = [(gram, ranges) for count, gram, ranges in grams[1:] if count <= grams[0][0] * FILTER_RATIO]
+
+        matches = []
+        for candidates in chunks:
+            for gram, ranges in filter_grams:
+                if len(candidates) == 0:
+                    break
+                first, last = int(candidates[0]), int(candidates[-1])
+                held = np.zeros(last - first + 1, dtype=bool)   # Whether each source of the chunk holds the gram
+                for others in self.postings(self.posting_ranges(gram, first, last, ranges)):
+                    held[others - first] = True
+                candidates = candidates[held[candidates - first]]
+
+            matches.extend(i for i in candidates.tolist() if query in self.name(i).lower())
+            if len(matches) > limit:
+                break
+
+        return self.remember(query, np.array(matches[:limit], dtype=np.int64), len(matches) <= limit)
+
+    def remember(self, query, results, complete):
+        """Keeps the results of a query for refining it as it is typed further, and returns them."""
+
+        self.last_query, self.last_results, self.last_complete = query, results, complete
+        return results, complete
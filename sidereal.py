@@ -0,0 +1,43 @@
+import functools
+
+import numpy as np
+
+UNIX_EPOCH_JD = 2440587.5   # Julian date of 1970-01-01 00:00 UTC
+J2000_JD = 2451545.0    # Julian date of the J2000.0 epoch
+
+# GMST minus Earth rotation angle as a polynomial of Julian centuries since J2000 in arcseconds (IERS 2003)
+GMST_POLYNOMIAL = (0.014506, 4612.156534, 1.3915817, -0.00000044, -0.000029956, -0.0000000368)
+
+
+def gmst_hours(unix_time):
+    """Returns Greenwich mean sidereal time in fractional hours for Unix timestamps.
+
+    UTC is used in place of UT1, which differs by less than a second.
+    """
+
+    days = (np.asarray(unix_time, dtype=np.float64) / 86400 + UNIX_EPOCH_JD) - J2000_JD
+
+    # Earth rotation angle in turns, whole days split off first to keep precision
+    whole_days = np.floor(days)
+    rotation = (days - whole_days) + (0.7790572732640 + 0.00273781191135448 * days) % 1
+
+    centuries = days / 36525
+    precession = np.polynomial.polynomial.polyval(centuries, GMST_POLYNOMIAL)
+
+    return (rotation * 24 + precession / 54000) % 24
+
+
+def local_sidereal_hours(unix_time, longitude):
+    """Returns local mean sidereal time in fractional hours for Unix timestamps at given east longitude."""
+
+    if np.ndim(unix_time) == 0:
+        return _cached_local_sidereal_hours(float(unix_time), float(longitude))
+
+    return (gmst_hours(unix_time) + longitude / 15) % 24
+
+
+@functools.lru_cache(maxsize=4096)
+def _cached_local_sidereal_hours(unix_time, longitude):
+    """Memoized local sidereal time of single timestamps, e.g. repeated frames of the same time."""
+
+    return float((gmst_hours(unix_time) + longitude / 15) % 24)
@@ -0,0 +1,116 @@
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from positions import PositionEngine, lst_hours
+from visibility import RiseSetSolver
+
+_worker_state = {}  # Shared source arrays and engine of a worker process
+
+
+class SharedCatalog:
+    """Source catalog arrays in shared memory, created once and attached by name from worker processes."""
+
+    def __init__(self, count, name=None):
+        self.count = count
+        self.owner = name is None
+        self.memory = shared_memory.SharedMemory(name=name, create=self.owner, size=max(1, count * 48))
+
+        # Right ascension, declination, epoch, proper motions and body numbers as the rows of one block
+        self.columns = np.ndarray((6, count), dtype=np.float64, buffer=self.memory.buf)
+
+    def close(self):
+        """Detaches from the shared memory, releasing it if this is the creating process."""
+
+        self.columns = None     # Views must be dropped before the buffer is closed
+        self.memory.close()
+        if self.owner:
+            self.memory.unlink()
+
+
+def _init_worker(memory_name, count, names):
+    """Attaches the shared source arrays once per worker process."""
+
+    catalog = SharedCatalog(count, memory_name)
+    engine = PositionEngine([], (0, 0))
+    engine.set_source_arrays(*catalog.columns)
+
+    _worker_state["catalog"] = catalog
+    _worker_state["engine"] = engine
+    _worker_state["rise_set"] = RiseSetSolver(engine)
+    _worker_state["names"] = names
+
+
+def worker_engine(site):
+    """Returns the position engine of the current worker process, set to the coordinates of given site."""
+
+    engine = _worker_state["engine"]
+    engine.coordinates = (site[1], site[2])
+    return engine
+
+
+def worker_names():
+    """Returns source names passed to the current worker process."""
+
+    return _worker_state["names"]
+
+
+def _site_events(site, local_time):
+    """Computes rise, culmination and set times of all sources for one site in a worker process."""
+
+    worker_engine(site)
+    return _worker_state["rise_set"].events(local_time, site[3])
+
+
+def _site_tracks(site, timestamps):
+    """Computes altitude and azimuth of all sources at given times for one site in a worker process."""
+
+    engine = worker_engine(site)
+    engine.set_time(timestamps[0])
+    return engine.altitude_azimuth(lst_hours(timestamps, (site[1], site[2])), timestamps)
+
+
+class SitePool:
+    """Worker processes computing per-site results in parallel from one shared copy of the source arrays.
+
+    Sources added to the engine afterwards are not seen by the workers, so a new pool is needed then.
+    """
+
+    def __init__(self, engine, names=None, workers=None):
+        self.catalog = SharedCatalog(len(engine))
+        self.catalog.columns[:] = engine.catalog_arrays()
+        # Workers are started fresh instead of forked, as the pool may be created from the running Qt GUI
+        self.executor = ProcessPoolExecutor(max_workers=workers or os.cpu_count() or 1,
+                                            mp_context=multiprocessing.get_context("spawn"), initializer=_init_worker,
+                                            initargs=(self.catalog.memory.name, len(engine), names))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exception):
+        self.close()
+
+    def map(self, function, sites, *args):
+        """Calls function(site, *args) for each site in parallel and returns the results in site order."""
+
+        futures = [self.executor.submit(function, site, *args) for site in sites]
+        return [future.result() for future in futures]
+
+    def events(self, sites, local_time):
+        """Returns rise, culmination and set times around given time for each site, see RiseSetSolver.events."""
+
+        return self.map(_site_events, sites, local_time)
+
+    def tracks(self, sites, timestamps):
+        """Returns (altitude, azimuth) arrays of shape (time, source) for each site."""
+
+        return self.map(_site_tracks, sites, timestamps)
+
+    def close(self):
+        """Stops the worker processes and releases the shared memory."""
+
+        self.executor.shutdown(cancel_futures=True)
+        self.catalog.close()
@@ -0,0 +1,82 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from catalog import cache_files, load_sources, save_sources, update_sources_in_place  # noqa: E402
+
+SOURCE_LINES = [
+    "Source Size|Source Color",
+    "5|#0000F0",
+    "10|#F0F000",
+    "20|#F000F0",
+    "",
+    "Source|Right Ascension|Declination|Type|Trace|Epoch|PM RA|PM Dec",
+    "H1504+65|15:02:09.62|+66:12:18.6|2|1",
+    "Ω Centauri é|13:26:47.28|-47:28:46.1|1|0",
+    '"Alpha|Beta"|01:02:03.00|+04:05:06.0|0|0',
+    "Barnard's Star|17:57:48.50|+04:41:36.2|0|0|2000.0|-798.58|10328.12",
+    "Moon|Moon||2|1",
+]
+
+
+@pytest.fixture
+def source_file(tmp_path):
+    """Returns a source file with CRLF line endings and its sources loaded once to create the cache."""
+
+    file = str(tmp_path / "sources.csv")
+    with open(file, 'wb') as csv_file:
+        csv_file.write(("\r\n".join(SOURCE_LINES) + "\r\n").encode("utf-8"))
+    load_sources(file)
+    return file
+
+
+def assert_same_sources(sources, expected):
+    assert [source[0] for source in sources] == [source[0] for source in expected]
+    assert [source[3:5] for source in sources] == [source[3:5] for source in expected]
+    for source, expected_source in zip(sources, expected):
+        assert source[1:3] == (expected_source[1:3] if isinstance(source[1], str)
+                               else pytest.approx(expected_source[1:3], abs=1e-5))
+        assert source[5:] == pytest.approx(expected_source[5:])
+
+
+def test_update_in_place_matches_rewrite(source_file, tmp_path):
+    types, sources = load_sources(source_file)
+    with open(source_file, 'rb') as csv_file:
+        original = csv_file.read()
+
+    # Edit a plain row, the non-ASCII name, the 8-column row and the body row
+    for i, source_type, trace in ((0, 0, 0), (1, 2, 1), (3, 1, 1), (4, 0, 0)):
+        sources[i][3:5] = [source_type, trace]
+    assert update_sources_in_place(types, sources, source_file)
+
+    with open(source_file, 'rb') as csv_file:
+        data = csv_file.read()
+    assert len(data) == len(original) and data.count(b"\r\n") == original.count(b"\r\n")
+
+    rewritten_file = str(tmp_path / "rewritten.csv")
+    save_sources(types, sources, rewritten_file)
+    assert_same_sources(load_sources(rewritten_file)[1], sources)
+
+    assert load_sources(source_file) == (types, sources)    # Read from the updated cache
+    for file in cache_files(source_file):
+        os.remove(file)
+    reloaded_types, reloaded_sources = load_sources(source_file)
+    assert reloaded_types == types
+    assert_same_sources(reloaded_sources, sources)
+
+
+def test_update_in_place_leaves_quoted_rows_to_rewrite(source_file):
+    types, sources = load_sources(source_file)
+    with open(source_file, 'rb') as csv_file:
+        original = csv_file.read()
+
+    sources[2][4] = 1
+    assert not update_sources_in_place(types, sources, source_file)
+    with open(source_file, 'rb') as csv_file:
+        assert csv_file.read() == original
+
+    save_sources(types, sources, source_file)
+    assert_same_sources(load_sources(source_file)[1], sources)
@@ -0,0 +1,32 @@
+import os
+import sys
+import time
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")   # Run without a display
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PyQt6.QtGui import QColor, QImage  # noqa: E402
+from PyQt6.QtWidgets import QApplication  # noqa: E402
+
+from catalog import SOURCE_FILE, load_sites, load_sources  # noqa: E402
+from charts import render_frames  # noqa: E402
+
+app = QApplication.instance() or QApplication([])
+
+
+def grid_pixel_count(image):
+    """Returns the number of gray pixels of an image, as drawn by the antialiased chart grid lines."""
+
+    colors = (QColor(image.pixel(x, y)) for y in range(0, image.height(), 2) for x in range(image.width()))
+    return sum(color.red() == color.green() == color.blue() and 0x60 <= color.red() <= 0xE0 for color in colors)
+
+
+def test_time_lapse_frames_contain_grid(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    load_sources()  # Creates the default source file and its cache for the workers
+
+    times = [time.mktime((2025, 6, 1, 23, 0, 0, 0, 0, -1))]
+    outputs = [str(tmp_path / "frame.png")]
+    assert list(render_frames(SOURCE_FILE, load_sites()[0], 3.0, times, outputs, workers=1))
+
+    assert grid_pixel_count(QImage(outputs[0])) > 2000
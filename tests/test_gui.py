@@ -0,0 +1,61 @@
+import os
+import sys
+import time
+
+import pytest
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")   # Run without a display
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PyQt6.QtCore import Qt  # noqa: E402
+from PyQt6.QtTest import QTest  # noqa: E402
+from PyQt6.QtWidgets import QApplication  # noqa: E402
+
+from main import GUIView  # noqa: E402
+
+app = QApplication.instance() or QApplication([])
+
+
+@pytest.fixture
+def view(tmp_path, monkeypatch):
+    """Returns a shown GUI window using the default config and sources in a temporary directory."""
+
+    monkeypatch.chdir(tmp_path)
+    view = GUIView(time.mktime((2025, 6, 1, 22, 0, 0, 0, 0, -1)))
+    view.show()
+    app.processEvents()
+    yield view
+    view.scene.close_site_pool()
+
+
+def test_search_input_receives_hotkeys(view):
+    scene = view.scene
+    local_time = scene.local_time
+    scene.search_input.setFocus()
+
+    QTest.keyClicks(view.viewport(), "ss um")
+    assert scene.search_input.text() == "ss um"
+    assert scene.local_time == local_time and scene.menu_rows is not None
+
+    QTest.keyClick(view.viewport(), Qt.Key.Key_Escape)   # Clears the search and leaves the box
+    assert scene.search_input.text() == "" and scene.menu_rows is None
+    scene.search_input.setFocus()
+    QTest.keyClicks(view.viewport(), "wd")
+    assert scene.search_input.text() == "wd"
+    assert scene.local_time == local_time
+    assert [scene.sources[i][0] for i in scene.menu_rows] == ["WD 1337+705"]
+
+
+def test_local_time_input_receives_playback_keys(view):
+    scene = view.scene
+    playback_speed = scene.playback_speed
+    scene.local_input.setFocus()
+    scene.local_input.clear()
+
+    QTest.keyClicks(view.viewport(), "2025-06-02 01:30")
+    QTest.keyClick(view.viewport(), Qt.Key.Key_Return)
+    assert scene.local_time == time.mktime(time.strptime("2025-06-02 01:30", "%Y-%m-%d %H:%M"))
+    assert scene.playback_speed == playback_speed
+
+    QTest.keyClicks(view.viewport(), "pr+")
+    assert not scene.playback_timer.isActive() and scene.playback_direction == 1
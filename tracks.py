@@ -0,0 +1,145 @@
+import argparse
+import csv
+import os
+import re
+import time
+
+import numpy as np
+
+from catalog import load_sites, load_sources
+from positions import PositionEngine, lst_hours, parse_local_time
+from sites import SitePool, worker_engine, worker_names
+
+CHUNK_ELEMENTS = 2_000_000  # Approximate number of (time, source) values computed per chunk
+
+
+def time_grid_chunks(start_time, end_time, step, n_sources, chunk_elements=CHUNK_ELEMENTS):
+    """Yields consecutive arrays of Unix timestamps covering the time grid."""
+
+    n_times = int((end_time - start_time) // step) + 1
+    chunk_size = max(1, chunk_elements // max(1, n_sources))
+    for chunk_start in range(0, n_times, chunk_size):
+        yield start_time + np.arange(chunk_start, min(chunk_start + chunk_size, n_times)) * step
+
+
+def generate_tracks(engine, start_time, end_time, step, chunk_elements=CHUNK_ELEMENTS):
+    """Yields (timestamps, altitudes, azimuths) chunks for all sources over the time grid."""
+
+    for timestamps in time_grid_chunks(start_time, end_time, step, len(engine), chunk_elements):
+        engine.set_time(timestamps[0])  # Places of fixed sources change too slowly to matter within a chunk
+        altitude, azimuth = engine.altitude_azimuth(lst_hours(timestamps, engine.coordinates), timestamps)
+        yield timestamps, altitude, azimuth
+
+
+def write_csv(file, names, chunks):
+    """Writes track chunks as pipe-delimited rows, one per source and time step."""
+
+    with open(file, 'w', newline='', encoding="utf-8") as csv_file:
+        csv_writer = csv.writer(csv_file, delimiter='|')
+        csv_writer.writerow(["Local Time", "Source", "Altitude", "Azimuth"])
+        for timestamps, altitude, azimuth in chunks:
+            altitude = np.round(altitude, 3).tolist()
+            azimuth = np.round(azimuth, 3).tolist()
+            for i, timestamp in enumerate(timestamps.tolist()):
+                time_text = time.strftime("%Y-%m-%d %H:%M", time.localtime(timestamp))
+                csv_writer.writerows(zip([time_text] * len(names), names, altitude[i], azimuth[i]))
+
+
+def write_columns(directory, names, n_times, chunks):
+    """Writes track chunks into memory-mapped .npy column files in given directory."""
+
+    os.makedirs(directory, exist_ok=True)
+    with open(os.path.join(directory, "sources.txt"), 'w', encoding="utf-8") as name_file:
+        name_file.writelines(f"{name}\n" for name in names)
+
+    columns = {
+        "time": np.lib.format.open_memmap(os.path.join(directory, "time.npy"), mode='w+',
+                                          dtype=np.float64, shape=(n_times,)),
+        "altitude": np.lib.format.open_memmap(os.path.join(directory, "altitude.npy"), mode='w+',
+                                              dtype=np.float32, shape=(n_times, len(names))),
+        "azimuth": np.lib.format.open_memmap(os.path.join(directory, "azimuth.npy"), mode='w+',
+                                             dtype=np.float32, shape=(n_times, len(names))),
+    }
+
+    row = 0
+    for timestamps, altitude, azimuth in chunks:
+        columns["time"][row:row + len(timestamps)] = timestamps
+        columns["altitude"][row:row + len(timestamps)] = altitude
+        columns["azimuth"][row:row + len(timestamps)] = azimuth
+        row += len(timestamps)
+
+    for column in columns.values():
+        column.flush()
+
+
+def write_tracks(engine, names, start_time, end_time, step, output, output_format):
+    """Generates tracks of all sources over the time grid and writes them in given format."""
+
+    n_times = int((end_time - start_time) // step) + 1
+    chunks = generate_tracks(engine, start_time, end_time, step)
+    if output_format == "csv":
+        write_csv(output, names, chunks)
+    else:
+        write_columns(output, names, n_times, chunks)
+
+
+def _write_site_tracks(site, start_time, end_time, step, output, output_format):
+    """Writes tracks of one site to its own output in a worker process sharing the source arrays."""
+
+    output = site_output(output, site[0])
+    write_tracks(worker_engine(site), worker_names(), start_time, end_time, step, output, output_format)
+    return output
+
+
+def site_output(output, site_name):
+    """Returns the output path of one site, with the site name added before any file extension."""
+
+    root, extension = os.path.splitext(output)
+    return f"{root}_{re.sub(r'[^A-Za-z0-9-]+', '_', site_name)}{extension}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate altitude/azimuth tracks for all sources without the GUI.")
+    parser.add_argument("start", type=parse_local_time, help='local start time, "YYYY-MM-DD HH:MM"')
+    parser.add_argument("end", type=parse_local_time, help='local end time, "YYYY-MM-DD HH:MM"')
+    parser.add_argument("step", type=float, help="time step in minutes")
+    parser.add_argument("output", help="output CSV file, or directory of .npy columns with --format npy")
+    parser.add_argument("--format", choices=("csv", "npy"), default="csv", help="output format")
+    parser.add_argument("--sources", default=None, help="source file to read instead of the default")
+    parser.add_argument("--config", default=None, help="config file to read instead of the default")
+    parser.add_argument("--site", action="append", default=None,
+                        help="name of a configured site to use instead of the first one, can be repeated")
+    parser.add_argument("--all-sites", action="store_true", help="write tracks of every configured site")
+    args = parser.parse_args()
+
+    sites = load_sites() if args.config is None else load_sites(args.config)
+    if args.site is not None:
+        unknown = set(args.site) - {site[0] for site in sites}
+        if unknown:
+            parser.error(f"unknown sites: {', '.join(sorted(unknown))}")
+        sites = [site for site in sites if site[0] in args.site]
+    elif not args.all_sites:
+        sites = sites[:1]
+
+    _, sources = load_sources() if args.sources is None else load_sources(args.sources)
+    if args.step <= 0 or args.end < args.start:
+        parser.error("time grid must have a positive step and end after start")
+
+    engine = PositionEngine(sources, (sites[0][1], sites[0][2]))
+    names = [source[0] for source in sources]
+    step = args.step * 60
+    n_times = int((args.end - args.start) // step) + 1
+
+    if len(sites) == 1:
+        write_tracks(engine, names, args.start, args.end, step, args.output, args.format)
+        outputs = [args.output]
+    else:
+        # Each site is written by its own worker process, all reading the same shared source arrays
+        with SitePool(engine, names, workers=min(len(sites), os.cpu_count() or 1)) as pool:
+            outputs = pool.map(_write_site_tracks, sites, args.start, args.end, step, args.output, args.format)
+
+    print(f"Tracks for {len(names)} sources over {n_times} time steps written to {', '.join(outputs)}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,85 @@
+import numpy as np
+
+from positions import lst_hours
+
+SIDEREAL_RATE = 1.00273790935  # Sidereal hours per solar hour
+
+
+def limit_hour_angles(declination, latitude, min_elevation):
+    """Returns hour angles in hours at which sources of given declinations cross given elevation."""
+
+    declination = np.radians(declination)
+    latitude = np.radians(latitude)
+    cos_hour_angle = ((np.sin(np.radians(min_elevation)) - np.sin(latitude) * np.sin(declination))
+                      / (np.cos(latitude) * np.cos(declination)))
+
+    return np.degrees(np.arccos(np.clip(cos_hour_angle, -1, 1))) / 15
+
+
+class RiseSetSolver:
+    """Closed-form rise, set and culmination times for all sources of a position engine."""
+
+    def __init__(self, engine):
+        self.engine = engine
+        self._hour_angle_cache = {}
+
+    def limit_hour_angles(self, min_elevation):
+        """Returns hour angles in hours at which each source crosses given elevation.
+
+        Sources that stay above the limit get 12 and sources that never reach it get 0. Results are
+        memoized per latitude, elevation limit and day of the source places, and extended when sources are
+        added to the engine.
+        """
+
+        key = (self.engine.coordinates[0], min_elevation, self.engine.day)
+        hour_angles = self._hour_angle_cache.get(key)
+        if hour_angles is None:
+            # Results of other days are dropped, as source places only move forward or back a day at a time
+            self._hour_angle_cache = {cached: value for cached, value in self._hour_angle_cache.items()
+                                      if cached[2] == key[2]}
+            hour_angles = np.empty(0)
+
+        if len(hour_angles) < len(self.engine):
+            hour_angles = np.concatenate((hour_angles, limit_hour_angles(self.engine.declination[len(hour_angles):],
+                                                                         key[0], min_elevation)))
+            self._hour_angle_cache[key] = hour_angles
+
+        # Bodies move within the day, so their hour angles are always recomputed
+        hour_angles = hour_angles[:len(self.engine)]
+        if len(self.engine.body_indices):
+            hour_angles = hour_angles.copy()
+            hour_angles[self.engine.body_indices] = limit_hour_angles(
+                self.engine.declination[self.engine.body_indices], key[0], min_elevation)
+
+        return hour_angles
+
+    def clear(self):
+        """Drops memoized hour angles, e.g. after source coordinates have changed."""
+
+        self._hour_angle_cache.clear()
+
+    def events(self, local_time, min_elevation):
+        """Returns rise, culmination and set times nearest to given time along with time above the limit.
+
+        Times are Unix timestamps, NaN for rise/set of sources that never cross the limit. The returned
+        dictionary also holds the culmination elevation and hours per day spent above the limit.
+        """
+
+        self.engine.set_time(local_time)
+        hour_angles = self.limit_hour_angles(min_elevation)
+
+        # Offset from given time to nearest culmination, only one LST evaluation needed per query
+        hours_to_culmination = ((self.engine.right_ascension - lst_hours(local_time, self.engine.coordinates)
+                                 + 12) % 24 - 12) / SIDEREAL_RATE
+        culmination = local_time + hours_to_culmination * 3600
+
+        crosses_limit = (hour_angles > 0) & (hour_angles < 12)
+        half_duration = np.where(crosses_limit, hour_angles / SIDEREAL_RATE * 3600, np.nan)
+
+        return {
+            "rise": culmination - half_duration,
+            "culmination": culmination,
+            "set": culmination + half_duration,
+            "culmination_elevation": 90 - np.abs(self.engine.coordinates[0] - self.engine.declination),
+            "hours_above": 2 * hour_angles / SIDEREAL_RATE,
+        }